@@ -0,0 +1,314 @@
+import argparse
+import base64
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import auth_utils
+import data_versions
+import db_utils
+import resilience
+import rollup_utils
+
+logger = logging.getLogger(__name__)
+
+# 只读JSON接口的监听端口，0为不启动
+API_PORT = int(os.environ.get("API_PORT", "8502"))
+# 监听地址，默认只允许本机访问；容器中需设为0.0.0.0
+API_HOST = os.environ.get("API_HOST", "127.0.0.1")
+# 分页接口默认每页条数
+API_PAGE_SIZE = int(os.environ.get("API_PAGE_SIZE", "100"))
+# 分页接口每页条数上限
+API_MAX_PAGE_SIZE = int(os.environ.get("API_MAX_PAGE_SIZE", "1000"))
+# 值班安排一次最多查询的天数
+API_MAX_DUTY_DAYS = 31
+
+STATS_FIELDS = ("work_type", "recorder", "priority", "day")
+
+class ApiError(Exception):
+    """返回给调用方的错误，status为HTTP状态码"""
+
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+# ---- 参数与游标 ----
+
+def _param(query, name, convert=str, default=None):
+    values = query.get(name)
+    if not values or values[0] == "":
+        return default
+    try:
+        return convert(values[0])
+    except ValueError:
+        raise ApiError(400, f"参数{name}格式不正确") from None
+
+def _limit(query):
+    limit = _param(query, "limit", int, API_PAGE_SIZE)
+    if not 1 <= limit <= API_MAX_PAGE_SIZE:
+        raise ApiError(400, f"limit取值范围为1~{API_MAX_PAGE_SIZE}")
+    return limit
+
+def _flag(value):
+    if value not in ("0", "1"):
+        raise ValueError(value)
+    return int(value)
+
+def encode_cursor(value):
+    """游标对调用方不透明：JSON序列化后做URL安全的base64编码"""
+    raw = json.dumps(value, default=_json_default, separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        return json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+    except ValueError:
+        raise ApiError(400, "cursor无效") from None
+
+def _json_default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+# ---- 接口 ----
+
+def _records(db, query):
+    """GET /api/records：按ID游标分页的工作记录，支持priority、is_completed、recorder、work_type筛选"""
+    cursor = _param(query, "cursor")
+    after = decode_cursor(cursor) if cursor else None
+    if after is not None and not isinstance(after, int):
+        raise ApiError(400, "cursor无效")
+    rows, next_cursor = db_utils.get_record_page(
+        db, after=after, limit=_limit(query),
+        priority=_param(query, "priority", int),
+        is_completed=_param(query, "is_completed", _flag),
+        recorder=_param(query, "recorder"),
+        work_type=_param(query, "work_type"),
+    )
+    return {
+        "items": [row._asdict() for row in rows],
+        "next_cursor": encode_cursor(next_cursor) if next_cursor is not None else None,
+    }
+
+def _todos(db, query):
+    """GET /api/todos：截止到date（默认今天）的未完成工作，按优先级、结束日期分页"""
+    cursor = _param(query, "cursor")
+    after = None
+    if cursor:
+        try:
+            priority, end_date, record_id = decode_cursor(cursor)
+            after = (int(priority), date.fromisoformat(end_date), int(record_id))
+        except (TypeError, ValueError):
+            raise ApiError(400, "cursor无效") from None
+    rows, next_cursor = db_utils.get_todo_page(
+        db, date=_param(query, "date", date.fromisoformat, date.today()), limit=_limit(query), after=after
+    )
+    return {
+        "items": [row._asdict() for row in rows],
+        "next_cursor": encode_cursor(next_cursor) if next_cursor is not None else None,
+    }
+
+def _duty(db, query):
+    """GET /api/duty：从start（默认今天）起days天的值班安排"""
+    days = _param(query, "days", int, 7)
+    if not 1 <= days <= API_MAX_DUTY_DAYS:
+        raise ApiError(400, f"days取值范围为1~{API_MAX_DUTY_DAYS}")
+    start = _param(query, "start", date.fromisoformat, date.today())
+    return {"items": db_utils.get_duty_schedule(db, start, days)}
+
+def _stats(db, query):
+    """GET /api/stats：按field（work_type、recorder、priority、day）分组的记录数，取自每日汇总表"""
+    field = _param(query, "field", default="work_type")
+    if field not in STATS_FIELDS:
+        raise ApiError(400, f"field取值为{'、'.join(STATS_FIELDS)}")
+    totals = rollup_utils.get_totals_by(db, field,
+                                        _param(query, "start", date.fromisoformat),
+                                        _param(query, "end", date.fromisoformat))
+    return {"field": field, "totals": {_json_key(key): count for key, count in totals.items()}}
+
+def _json_key(key):
+    return key.isoformat() if isinstance(key, date) else str(key)
+
+# 路径 -> (处理函数, ETag依赖的数据类别)
+ROUTES = {
+    "/api/records": (_records, data_versions.WORK_RECORDS),
+    "/api/todos": (_todos, data_versions.WORK_RECORDS),
+    "/api/duty": (_duty, data_versions.DUTY),
+    "/api/stats": (_stats, data_versions.WORK_RECORDS),
+}
+
+# ---- 认证 ----
+
+_user_teams = {"version": None, "teams": {}}
+_user_teams_lock = threading.Lock()
+
+def _team_for(username):
+    """用户所属团队，按用户数据版本缓存；用户已删除时返回None"""
+    version = db_utils.get_data_version(data_versions.USERS)
+    with _user_teams_lock:
+        if _user_teams["version"] != version:
+            _user_teams["version"] = version
+            _user_teams["teams"] = {}
+        if username in _user_teams["teams"]:
+            return _user_teams["teams"][username]
+    db = next(db_utils.get_read_session(prefer_primary=True))
+    try:
+        team_id = db_utils.get_user_team_id(db, username)
+    finally:
+        db.close()
+    with _user_teams_lock:
+        if _user_teams["version"] == version:
+            _user_teams["teams"][username] = team_id
+    return team_id
+
+def authenticate(headers):
+    """校验Authorization: Bearer <JWT>，返回(用户名, 团队ID)"""
+    scheme, _, token = (headers.get("Authorization") or "").partition(" ")
+    if scheme.lower() != "bearer" or not token:
+        raise ApiError(401, "缺少Bearer token")
+    username = auth_utils.verify_jwt_token(token.strip())
+    if not username:
+        raise ApiError(401, "token无效或已过期")
+    team_id = _team_for(username)
+    if team_id is None:
+        raise ApiError(401, "用户不存在")
+    return username, team_id
+
+# ---- ETag ----
+
+def compute_etag(entity, team_id, path, query_string):
+    """弱ETag：同一团队、同一请求在数据版本和日期不变时结果不变
+
+    日期参与计算，因为待办和值班轮换的结果随日期变化
+    """
+    version = db_utils.get_data_version(entity)
+    source = f"{entity}:{version}:{team_id}:{date.today().isoformat()}:{path}?{query_string}"
+    return f'W/"{hashlib.sha1(source.encode("utf-8")).hexdigest()[:20]}"'
+
+def etag_matches(if_none_match, etag):
+    if not if_none_match:
+        return False
+    tags = [tag.strip() for tag in if_none_match.split(",")]
+    # 弱比较：忽略W/前缀
+    return "*" in tags or etag.removeprefix("W/") in [tag.removeprefix("W/") for tag in tags]
+
+# ---- HTTP服务 ----
+
+class ApiHandler(BaseHTTPRequestHandler):
+    server_version = "WorkRecordAPI/1.0"
+
+    def do_GET(self):
+        started = time.perf_counter()
+        url = urlsplit(self.path)
+        try:
+            route = ROUTES.get(url.path.rstrip("/"))
+            if route is None:
+                raise ApiError(404, "接口不存在")
+            handler, entity = route
+            username, team_id = authenticate(self.headers)
+            # 每个请求在单独的线程中处理，绑定的团队只作用于本请求
+            db_utils.bind_team(team_id)
+            db_utils.bind_actor(username)
+
+            etag = compute_etag(entity, team_id, url.path, url.query)
+            if etag_matches(self.headers.get("If-None-Match"), etag):
+                self._send(304, None, etag)
+                return
+            # 响应带有按数据版本计算的ETag，必须读主库：副本上的旧数据一旦带着新ETag返回，
+            # 调用方之后的304会一直沿用这份旧数据
+            db = next(db_utils.get_read_session(prefer_primary=True))
+            try:
+                payload = handler(db, parse_qs(url.query))
+            finally:
+                db.close()
+            self._send(200, payload, etag)
+        except ApiError as exc:
+            self._send(exc.status, {"error": exc.message})
+        except Exception as exc:
+            if isinstance(exc, resilience.CircuitOpenError) or resilience.is_transient(exc):
+                self._send(503, {"error": "数据库暂时不可用，请稍后重试"}, retry_after=True)
+            else:
+                logger.exception("接口请求失败: %s", self.path)
+                self._send(500, {"error": "服务器内部错误"})
+        finally:
+            logger.debug("%s %.1fms", self.path, (time.perf_counter() - started) * 1000)
+
+    def _send(self, status, payload, etag=None, retry_after=False):
+        body = b""
+        if payload is not None:
+            body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode("utf-8")
+        self.send_response(status)
+        if payload is not None:
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        if etag:
+            self.send_header("ETag", etag)
+            # 允许调用方缓存，但每次使用前都须用If-None-Match重新验证
+            self.send_header("Cache-Control", "private, no-cache")
+        if status == 401:
+            self.send_header("WWW-Authenticate", "Bearer")
+        if retry_after:
+            self.send_header("Retry-After", str(int(resilience.CIRCUIT_RESET_SECONDS)))
+        self.end_headers()
+        if body:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        logger.info("%s - %s", self.address_string(), format % args)
+
+_server = {"instance": None, "thread": None}
+_lock = threading.Lock()
+
+def start_server(host=API_HOST, port=API_PORT):
+    """在后台线程中启动只读JSON接口，每个进程只启动一次；port为0时不启动"""
+    if port <= 0:
+        return None
+    with _lock:
+        if _server["instance"] is None:
+            try:
+                server = ThreadingHTTPServer((host, port), ApiHandler)
+            except OSError as exc:
+                # 多个应用进程共用端口时，只有第一个进程提供接口
+                logger.warning("JSON接口未启动，无法监听 %s:%s: %s", host, port, exc)
+                return None
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, name="api-server", daemon=True)
+            thread.start()
+            _server.update(instance=server, thread=thread)
+            logger.info("JSON接口已启动: http://%s:%s/api/", host, server.server_port)
+    return _server["instance"]
+
+def stop_server():
+    with _lock:
+        server = _server["instance"]
+        if server is not None:
+            server.shutdown()
+            server.server_close()
+            _server.update(instance=None, thread=None)
+
+def main():
+    parser = argparse.ArgumentParser(description="独立运行只读JSON接口")
+    parser.add_argument("--host", default=API_HOST)
+    parser.add_argument("--port", type=int, default=API_PORT or 8502)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    db_utils.init_db()
+    server = start_server(args.host, args.port)
+    if server is None:
+        raise SystemExit(1)
+    try:
+        while True:
+            time.sleep(60)
+    except KeyboardInterrupt:
+        stop_server()
+
+if __name__ == "__main__":
+    main()
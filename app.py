@@ -1,25 +1,49 @@
+import gc
 import time
-from datetime import date, timedelta, datetime
+import tracemalloc
+from datetime import datetime
 
 import jwt
 import pandas as pd
 import streamlit as st
 
+import archive_utils
+import async_db_utils
+import backup_utils
+import bootstrap
 import db_utils
+import live_refresh
+import memory_utils
+import pending_summary
+import projections
+import resilience
+import tenancy
 from auth_utils import verify_jwt_token, generate_jwt_token
 from auth_views import show_login_register_page
 from work_record_views import show_work_record_page, show_export_section
 
-# 初始化数据库
-db_utils.init_db()
-
 # 页面配置
 st.set_page_config(page_title="工作记录管理系统", layout="wide")
 
+# 初始化数据库（每个进程只执行一次）
+bootstrap.startup()
+
 # 获取数据库会话
 def get_db():
     return next(db_utils.get_db_session())
 
+# 获取只读数据库会话（可路由到只读副本）
+def get_read_db():
+    return next(db_utils.get_read_session())
+
+# 绑定当前用户所属的团队，团队ID在会话中只查询一次
+def bind_user_team(username):
+    cached = st.session_state.get("user_team")
+    if cached is None or cached[0] != username:
+        team_id = db_utils.get_user_team_id(get_read_db(), username)
+        st.session_state.user_team = (username, tenancy.DEFAULT_TEAM_ID if team_id is None else team_id)
+    db_utils.bind_team(st.session_state.user_team[1])
+
 # 检查JWT并自动续期
 def check_auth():
     # 先检查URL参数中的token
@@ -63,14 +87,10 @@ def check_auth():
     if 'username' not in st.session_state:
         st.session_state.username = username
         
-    # 检查前一天未完成的工作
-    if username:
-        yesterday = date.today() - timedelta(days=1)
-        db = next(db_utils.get_db_session())
-        uncompleted = db_utils.get_uncompleted_records(db, yesterday)
-        if uncompleted:
-            st.session_state.pending_records = uncompleted
-            st.session_state.show_pending_records = True
+    # 检查是否有逾期未完成的工作（读取本团队在进程内共享的待办摘要，不再每次重跑都查询）
+    bind_user_team(username)
+    if username and pending_summary.get_pending_summary()["overdue"]:
+        st.session_state.show_pending_records = True
     
     return True
 
@@ -79,6 +99,17 @@ if not check_auth():
     show_login_register_page()
     st.stop()
 
+# 绑定当前用户，写入后短时间内的读取回到主库；之后的查询只访问该用户所属团队的数据
+db_utils.bind_actor(st.session_state.username)
+bind_user_team(st.session_state.username)
+# 登记当前会话的状态占用，供系统管理页查看
+memory_utils.record_session(st.session_state.username)
+
+# 并发加载值班卡片所需的数据，数据库暂时不可用时使用最近一次成功加载的数据
+dashboard, dashboard_stale_at = resilience.last_known_good(
+    f"dashboard:{st.session_state.user_team[1]}", lambda: async_db_utils.run(async_db_utils.load_dashboard())
+)
+
 # 主界面重构
 st.title(f"工作记录管理系统 - 欢迎 {st.session_state.username}")
 
@@ -215,6 +246,7 @@ st.markdown("""
 if st.button("🚪 退出登录", key="logout_button", help="点击退出系统", use_container_width=True):
     st.session_state.pop('jwt_token', None)
     st.session_state.pop('username', None)
+    st.session_state.pop('user_team', None)
     st.query_params.clear()  # 修改为使用query_params.clear()
     st.rerun()
 
@@ -223,7 +255,7 @@ tab_main, tab_admin = st.tabs(["📊 工作记录", "⚙️ 系统管理"])
 
 with tab_admin:
     # 系统管理功能卡片导航
-    cols = st.columns(3)  # 修改为3列，增加备份按钮
+    cols = st.columns(5)  # 增加数据归档、会话内存按钮
     with cols[0]:
         if st.button("👥 用户管理", use_container_width=True, key="user_mgmt_btn"):
             st.session_state.current_admin_view = "users"
@@ -233,6 +265,12 @@ with tab_admin:
     with cols[2]:
         if st.button("💾 数据库备份", use_container_width=True, key="backup_btn"):
             st.session_state.current_admin_view = "backup"
+    with cols[3]:
+        if st.button("🗄️ 数据归档", use_container_width=True, key="archive_btn"):
+            st.session_state.current_admin_view = "archive"
+    with cols[4]:
+        if st.button("🧠 内存诊断", use_container_width=True, key="memory_btn"):
+            st.session_state.current_admin_view = "memory"
     
 
     # 根据选择显示对应功能
@@ -244,32 +282,36 @@ with tab_admin:
         with st.expander("用户管理"):
             st.subheader("用户列表")
             db = get_db()
-            users = db_utils.get_all_users(db)
+            users = projections.user_frame(db)
             
-            if users:
+            if not users.empty:
                 # 显示用户表格
-                user_df = pd.DataFrame([{
-                    "ID": u.id,
-                    "用户名": u.username,
-                    "上次登录": u.last_login
-                } for u in users])
-                st.dataframe(user_df)
+                st.dataframe(projections.display_frame(users))
             else:
                 st.warning("暂无用户")
             
+            teams = db_utils.get_all_teams(db)
+            team_names = {team.id: team.name for team in teams}
+            current_team_id = st.session_state.user_team[1]
+            team_ids = list(team_names)
+
             # 添加新用户
             st.subheader("添加用户")
             with st.form("add_user_form"):
                 new_username = st.text_input("用户名")
                 new_password = st.text_input("密码", type="password")
                 confirm_password = st.text_input("确认密码", type="password")
+                new_user_team = st.selectbox(
+                    "所属团队", team_ids, format_func=team_names.get,
+                    index=team_ids.index(current_team_id) if current_team_id in team_ids else 0
+                )
                 
                 if st.form_submit_button("添加"):
                     if new_password != confirm_password:
                         st.error("两次输入的密码不一致")
                     else:
                         db = get_db()
-                        user = db_utils.create_user(db, new_username, new_password)
+                        user = db_utils.create_user(db, new_username, new_password, team_id=new_user_team)
                         if user:
                             st.success(f"用户 {new_username} 添加成功")
                             st.rerun()
@@ -278,8 +320,8 @@ with tab_admin:
             
             # 修改密码
             st.subheader("修改密码")
-            if users:
-                usernames = [u.username for u in users]
+            if not users.empty:
+                usernames = users["username"].tolist()
                 selected_user = st.selectbox("选择用户", usernames)
                 with st.form("change_password_form"):
                     new_password = st.text_input("新密码", type="password")
@@ -300,7 +342,7 @@ with tab_admin:
             
             # 删除用户
             st.subheader("删除用户")
-            if users:
+            if not users.empty:
                 del_username = st.selectbox("选择要删除的用户", usernames, key="del_user_select")
                 if st.button("删除用户"):
                     db = get_db()
@@ -312,42 +354,72 @@ with tab_admin:
             else:
                 st.info("没有用户可删除")
 
+            # 团队：工作记录、值班人员和值班安排按团队隔离，用户只能看到本团队的数据
+            st.subheader("团队")
+            with st.form("add_team_form"):
+                new_team = st.text_input("新团队名称")
+                if st.form_submit_button("创建团队") and new_team:
+                    if db_utils.create_team(get_db(), new_team):
+                        st.success(f"团队 {new_team} 已创建")
+                        st.rerun()
+                    else:
+                        st.error("团队名称已存在")
+            if not users.empty:
+                team_cols = st.columns(2)
+                team_user = team_cols[0].selectbox("选择用户", usernames, key="team_user_select")
+                target_team = team_cols[1].selectbox("调整到团队", team_ids, format_func=team_names.get,
+                                                     key="team_target_select")
+                if st.button("调整团队"):
+                    if db_utils.set_user_team(get_db(), team_user, target_team):
+                        st.success(f"用户 {team_user} 已调整到 {team_names[target_team]}，重新登录后生效")
+                        st.rerun()
+                    else:
+                        st.error("调整失败")
+
     elif st.session_state.current_admin_view == "duty":
-        # 值班人员管理
+        # 值班人员管理：名单一次查询，在表格中直接改名、添加和删除
         with st.expander("值班人员管理"):
             st.subheader("值班人员名单")
-            db = get_db()
-            duty_personnel = db_utils.get_all_duty_personnel(db)
-            
-            # 添加新值班人员
-            new_person = st.text_input("添加值班人员姓名", key="new_person")
-            if st.button("添加") and new_person:
-                if db_utils.add_duty_person(db, new_person):
-                    st.success(f"已添加值班人员: {new_person}")
+            roster = db_utils.get_duty_roster(get_read_db())
+            st.caption("按ID顺序轮换值班。直接在表格中修改姓名、添加或删除行，点击“保存名单”后一次性提交；"
+                       "删除人员后，其已保存的值班日期回到自动轮换。")
+            original = pd.DataFrame([{"ID": person.id, "姓名": person.name, "今日值班": bool(person.assigned)}
+                                     for person in roster], columns=["ID", "姓名", "今日值班"])
+            if 'duty_editor_version' not in st.session_state:
+                st.session_state.duty_editor_version = 0
+            edited = st.data_editor(
+                original,
+                column_config={
+                    "ID": st.column_config.NumberColumn("ID", disabled=True),
+                    "姓名": st.column_config.TextColumn("姓名", required=True, max_chars=50),
+                    "今日值班": st.column_config.CheckboxColumn("今日值班", disabled=True),
+                },
+                num_rows="dynamic",
+                use_container_width=True,
+                hide_index=True,
+                key=f"duty_editor_{st.session_state.duty_editor_version}"
+            )
+
+            names = {person.id: person.name for person in roster}
+            kept = edited[edited["ID"].notna()]
+            renames = {int(person_id): name.strip() for person_id, name in zip(kept["ID"], kept["姓名"])
+                       if isinstance(name, str) and name.strip() and name.strip() != names.get(int(person_id))}
+            inserts = [name.strip() for name in edited.loc[edited["ID"].isna(), "姓名"]
+                       if isinstance(name, str) and name.strip()]
+            deletes = [person_id for person_id in names if person_id not in set(kept["ID"].astype(int))]
+            if renames or inserts or deletes:
+                st.info(f"待保存：改名 {len(renames)} 人，添加 {len(inserts)} 人，删除 {len(deletes)} 人")
+            if st.button("💾 保存名单", key="save_duty_personnel", disabled=not (renames or inserts or deletes)):
+                try:
+                    db_utils.apply_duty_personnel_changes(get_db(), renames=renames, inserts=inserts, deletes=deletes)
+                except ValueError as e:
+                    st.error(str(e))
+                else:
+                    st.session_state.duty_editor_version += 1
+                    st.success("值班人员名单已保存")
                     st.rerun()
-            
-            # 显示当前值班人员并支持编辑/删除
-            if duty_personnel:
-                st.write("当前值班人员名单:")
-                for person in duty_personnel:
-                    cols = st.columns([3, 1, 1])
-                    cols[0].write(person)
-                    
-                    # 编辑功能
-                    with cols[1].form(f"edit_{person}"):
-                        new_name = st.text_input("新姓名", value=person, key=f"edit_name_{person}")
-                        if st.form_submit_button("更新"):
-                            if db_utils.update_duty_person(db, person, new_name):
-                                st.success(f"已更新: {person} → {new_name}")
-                                st.rerun()
-                    
-                    # 删除功能
-                    if cols[2].button("删除", key=f"del_{person}"):
-                        if db_utils.delete_duty_person(db, person):
-                            st.success(f"已删除: {person}")
-                            st.rerun()
-            else:
-                st.warning("暂无值班人员，请先添加")
+            if not roster:
+                st.warning("暂无值班人员，请在表格中添加")
 
     elif st.session_state.current_admin_view == "backup":
         # 数据库备份功能
@@ -357,7 +429,7 @@ with tab_admin:
             
             if st.button("🔽 立即备份", use_container_width=True):
                 try:
-                    db = get_db()
+                    db = get_read_db()
                     backup_zip = db_utils.backup_database(db)
                     
                     st.download_button(
@@ -371,12 +443,139 @@ with tab_admin:
                 except Exception as e:
                     st.error(f"备份过程中出现错误: {str(e)}")
 
+            # 增量备份：只导出上次备份以来修改过的行和删除墓碑，保存在服务器的备份目录中
+            st.subheader("增量备份")
+            st.write(f"备份保存在 `{backup_utils.BACKUP_DIR}` 目录，恢复时依次应用最近一次全量备份和之后的增量备份："
+                     "`python backup_utils.py restore --target <数据库连接>`")
+            backup_cols = st.columns(2)
+            backup_kind = None
+            if backup_cols[0].button("📦 全量备份", use_container_width=True):
+                backup_kind = "full"
+            if backup_cols[1].button("➕ 增量备份", use_container_width=True):
+                backup_kind = "incremental"
+            if backup_kind:
+                try:
+                    manifest = backup_utils.create_backup(get_db(), backup_kind)
+                    st.success(f"已生成{'全量' if manifest['kind'] == 'full' else '增量'}备份 {manifest['file']}，"
+                               f"共 {sum(manifest['tables'].values())} 行、{manifest['tombstones']} 条删除记录")
+                except Exception as e:
+                    st.error(f"备份过程中出现错误: {str(e)}")
+
+            backups = backup_utils.list_backups()
+            if backups:
+                st.dataframe([{
+                    "文件": manifest["file"],
+                    "类型": "全量" if manifest["kind"] == "full" else "增量",
+                    "水位线": manifest["watermark"][:19].replace("T", " "),
+                    "行数": sum(manifest["tables"].values()),
+                    "删除记录": manifest["tombstones"],
+                } for manifest in reversed(backups)], use_container_width=True, hide_index=True)
+
+    elif st.session_state.current_admin_view == "archive":
+        # 旧记录归档
+        with st.expander("数据归档", expanded=True):
+            st.subheader("归档已完成的旧记录")
+            st.write("将结束日期早于指定天数的已完成记录分批迁移到归档表，日常查询只访问未归档数据。")
+            archive_cols = st.columns(2)
+            archive_days = archive_cols[0].number_input(
+                "归档多少天前结束的记录", min_value=1, value=archive_utils.ARCHIVE_AFTER_DAYS, key="archive_days"
+            )
+            archive_batch = archive_cols[1].number_input(
+                "每批记录数", min_value=50, max_value=10000, value=archive_utils.ARCHIVE_BATCH_SIZE, key="archive_batch"
+            )
+            db = get_db()
+            st.info(f"当前可归档记录: {archive_utils.count_archivable_records(db, archive_days)} 条")
+
+            if st.button("🗄️ 执行归档", use_container_width=True):
+                try:
+                    archived = archive_utils.archive_completed_records(
+                        db, older_than_days=archive_days, batch_size=archive_batch
+                    )
+                    st.success(f"已归档 {archived} 条记录")
+                except Exception as e:
+                    st.error(f"归档过程中出现错误: {str(e)}")
+
+    elif st.session_state.current_admin_view == "memory":
+        # 进程内存、数据库连接和各会话session_state占用
+        with st.expander("进程与数据库连接", expanded=True):
+            sessions = memory_utils.db_session_counts()
+            metric_cols = st.columns(4)
+            metric_cols[0].metric("进程常驻内存", memory_utils.format_bytes(memory_utils.process_rss()))
+            metric_cols[1].metric("未回收的数据库会话", sessions["alive"])
+            metric_cols[2].metric("持有事务的数据库会话", sessions["in_transaction"])
+            metric_cols[3].metric("tracemalloc", "追踪中" if tracemalloc.is_tracing() else "未开启")
+            engines = {"主库": db_utils.engine, "异步主库": async_db_utils.async_engine.sync_engine}
+            engines.update({f"副本{index + 1}": engine for index, engine in enumerate(db_utils.replica_engines)})
+            st.dataframe(memory_utils.pool_stats(engines), use_container_width=True, hide_index=True)
+
+        with st.expander("会话状态占用", expanded=True):
+            st.write("每个会话只保存界面状态和记录ID，待办和提醒数据由进程内共享的摘要提供。"
+                     f"各会话最多每 {memory_utils.SESSION_MEMORY_SAMPLE_SECONDS:.0f} 秒统计一次。")
+            footprints = memory_utils.session_footprints()
+            total = sum(entry["bytes"] for entry in footprints)
+            metric_cols = st.columns(3)
+            metric_cols[0].metric("活动会话", len(footprints))
+            metric_cols[1].metric("总占用", memory_utils.format_bytes(total))
+            metric_cols[2].metric("平均每会话", memory_utils.format_bytes(total / len(footprints) if footprints else 0))
+            if footprints:
+                st.dataframe([{
+                    "用户": entry["username"],
+                    "会话": entry["session_id"][:8],
+                    "占用": memory_utils.format_bytes(entry["bytes"]),
+                    "键数量": entry["keys"],
+                    "统计时间": entry["updated_at"].strftime("%H:%M:%S"),
+                } for entry in footprints], use_container_width=True, hide_index=True)
+                selected = st.selectbox("查看会话各键占用", options=range(len(footprints)),
+                                        format_func=lambda index: f"{footprints[index]['username']} "
+                                                                  f"({footprints[index]['session_id'][:8]})")
+                st.dataframe([{"键": key, "占用": memory_utils.format_bytes(size), "字节": size}
+                              for key, size in footprints[selected]["key_bytes"].items()],
+                             use_container_width=True, hide_index=True)
+
+        with st.expander("内存分配追踪", expanded=True):
+            st.write("开启tracemalloc后在不同时间拍摄快照，比较两次快照即可看到增长最多的分配位置。"
+                     "追踪期间每次内存分配都有额外开销，排查结束后请停止追踪。")
+            trace_cols = st.columns(3)
+            if not tracemalloc.is_tracing():
+                if trace_cols[0].button("▶️ 开始追踪", use_container_width=True):
+                    memory_utils.start_tracing()
+                    st.rerun()
+            else:
+                if trace_cols[0].button("📸 拍摄快照", use_container_width=True):
+                    memory_utils.take_snapshot()
+                if trace_cols[1].button("⏹️ 停止追踪", use_container_width=True):
+                    memory_utils.stop_tracing()
+                    st.rerun()
+            if trace_cols[2].button("🧹 执行垃圾回收", use_container_width=True):
+                st.toast(f"已回收 {gc.collect()} 个对象")
+
+            snapshot_entries = memory_utils.snapshots()
+            if snapshot_entries:
+                st.dataframe([{
+                    "快照": entry["label"],
+                    "追踪到的分配": memory_utils.format_bytes(entry["traced_bytes"]),
+                    "进程常驻内存": memory_utils.format_bytes(entry["rss"]),
+                } for entry in snapshot_entries], use_container_width=True, hide_index=True)
+                labels = [entry["label"] for entry in snapshot_entries]
+                compare_cols = st.columns(2)
+                new_label = compare_cols[1].selectbox("快照", labels, index=len(labels) - 1)
+                old_label = compare_cols[0].selectbox("对比基准", ["（不对比）"] + labels)
+                new_snapshot = snapshot_entries[labels.index(new_label)]["snapshot"]
+                if old_label in labels:
+                    rows = memory_utils.diff_snapshots(snapshot_entries[labels.index(old_label)]["snapshot"],
+                                                       new_snapshot)
+                else:
+                    rows = memory_utils.top_allocations(new_snapshot)
+                st.dataframe(rows, use_container_width=True, hide_index=True)
+
 # 主工作记录页面优化布局
 with tab_main:
     # 值班人员显示优化为卡片式布局
     st.markdown("### 📅 今日值班人员")
-    db = get_db()
-    today_duty = db_utils.get_today_duty_rotation(db)
+    if dashboard_stale_at:
+        st.warning(f"数据库暂时不可用，以下为 {dashboard_stale_at:%H:%M:%S} 的值班信息")
+    today_duty = dashboard["today_duty"]
+    duty_personnel = dashboard["duty_personnel"]
     
     if today_duty:
         st.markdown(f"""
@@ -385,7 +584,7 @@ with tab_main:
                 <div style="font-size: 2rem;">👤</div>
                 <div>
                     <h3 style="margin: 0; font-size: 1.2rem; color: #4b5563;">当前值班人员</h3>
-                    <p style="margin: 0.25rem 0 0 0; font-size: 1.5rem; font-weight: 600; color: #1f2937;">{today_duty[0]}</p>
+                    <p style="margin: 0.25rem 0 0 0; font-size: 1.5rem; font-weight: 600; color: #1f2937;">{today_duty.name}</p>
                 </div>
             </div>
         </div>
@@ -394,15 +593,19 @@ with tab_main:
         # 修改表单优化
         with st.expander("🔧 修改值班人员"):
             with st.form("edit_duty_form"):
+                # 选项为人员ID，名单与今日值班来自同一次查询
+                person_names = {person.id: person.name for person in duty_personnel}
                 new_duty = st.selectbox(
                     "选择值班人员",
-                    options=db_utils.get_all_duty_personnel(db),
-                    index=db_utils.get_all_duty_personnel(db).index(today_duty[0]) if today_duty[0] in db_utils.get_all_duty_personnel(db) else 0,
+                    options=list(person_names),
+                    index=list(person_names).index(today_duty.id),
+                    format_func=person_names.get,
                     key="duty_select"
                 )
                 
                 if st.form_submit_button("保存修改"):
-                    db_utils.save_today_duty(db, [new_duty])
+                    db = get_db()
+                    db_utils.save_today_duty(db, new_duty)
                     st.success("今日值班人员已更新!")
                     st.rerun()
     else:
@@ -415,25 +618,30 @@ with tab_main:
     show_export_section()
 
 # 侧边栏提醒部分 - 移动到主界面之外
-with st.sidebar:
+# 作为自动刷新片段定时重跑，其他用户完成或新增工作后自动更新，不重跑整个页面
+@live_refresh.live_fragment()
+def show_sidebar_reminders(version):
+    # 提醒数据来自进程内共享的待办摘要，按数据版本缓存，只包含数量和每个优先级最紧急的几项
+    summary = pending_summary.get_pending_summary()
+    if summary["overdue"]:
+        st.session_state.show_pending_records = True
+    priority_classes = {1: "low-priority", 2: "medium-priority", 3: "high-priority"}
+    priority_labels = {1: "低", 2: "中", 3: "高"}
+    priority_emojis = {1: "⏬", 2: "⏺️", 3: "🔺"}
+
     # 添加: 强化提醒条件判断
     if 'show_pending_records' in st.session_state and st.session_state.show_pending_records:
         st.markdown("### ⚠️ 待处理工作提醒")
         
-        # 获取最新未完成记录（防止数据陈旧）
-        db = get_db()
-        current_pending = db_utils.get_uncompleted_records(db)
-        
-        if current_pending:
+        if summary["total"]:
+            st.markdown(
+                f"共 **{summary['total']}** 项未完成，其中逾期 **{summary['overdue']}** 项，"
+                f"{pending_summary.DUE_SOON_DAYS}天内到期 **{summary['due_soon']}** 项"
+            )
             # 按优先级排序，高优先级在前
-            sorted_pending = sorted(current_pending, key=lambda x: x.priority, reverse=True)
+            pending_items = [item for priority in (3, 2, 1) for item in summary["top_by_priority"][priority]]
             
-            for record in sorted_pending:
-                # 根据优先级设置不同的样式
-                priority_classes = {1: "low-priority", 2: "medium-priority", 3: "high-priority"}
-                priority_labels = {1: "低", 2: "中", 3: "高"}
-                priority_emojis = {1: "⏬", 2: "⏺️", 3: "🔺"}
-                
+            for record in pending_items:
                 st.markdown(f"""
                 <div class="reminder-card {priority_classes.get(record.priority, '')}">
                     <div style="display: flex; justify-content: space-between; align-items: center;">
@@ -453,18 +661,20 @@ with st.sidebar:
                 if st.button(f"✅ 标记为已完成", key=f"sidebar_complete_{record.id}", use_container_width=True):
                         db = get_db()
                         db_utils.update_record(db, record.id, is_completed=1)
-                        st.session_state.pending_records = [
-                            r for r in st.session_state.pending_records if r.id != record.id
-                        ]
                         st.toast(f"记录 {record.id} 已标记为完成", icon='✅')
                         st.rerun()
+
+            if summary["total"] > len(pending_items):
+                st.caption(f"每个优先级仅显示最紧急的 {pending_summary.PENDING_TOP_N} 项")
+            if st.button("📋 查看全部待办", key="sidebar_show_all_todo", use_container_width=True):
+                st.session_state.current_work_record_view = "todo"
+                st.rerun()
         else:
             st.info("暂无待处理工作")
 
     # 新增：高优先级任务提醒
     st.markdown("### 🔴 高优先级任务")
-    db = get_db()
-    high_priority_records = db_utils.search_records(db, priority=3, is_completed=0)  # 获取高优先级未完成任务
+    high_priority_records = summary["top_by_priority"][3]  # 最紧急的高优先级未完成任务
     
     if high_priority_records:
         for record in high_priority_records:
@@ -481,8 +691,10 @@ with st.sidebar:
                 </div>
             </div>
             """, unsafe_allow_html=True)
+        if summary["high_priority"] > len(high_priority_records):
+            st.caption(f"共 {summary['high_priority']} 项高优先级任务，完整列表请查看待办事项")
     else:
         st.info("暂无高优先级任务")
 
-
-
+with st.sidebar:
+    show_sidebar_reminders()
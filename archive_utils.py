@@ -0,0 +1,79 @@
+import argparse
+import os
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import select, insert, delete, literal
+
+import backup_utils
+import data_versions
+from models import WorkRecord, WorkRecordArchive
+
+# 已完成记录在结束日期之后多少天归档
+ARCHIVE_AFTER_DAYS = int(os.environ.get("ARCHIVE_AFTER_DAYS", "365"))
+# 每批迁移的记录数，批次越小单次持锁时间越短
+ARCHIVE_BATCH_SIZE = int(os.environ.get("ARCHIVE_BATCH_SIZE", "500"))
+
+ARCHIVE_COLUMNS = ["id", "recorder", "work_type", "work_content", "start_date", "end_date", "is_completed", "priority",
+                   "team_id", "row_version"]
+
+def count_archivable_records(db, older_than_days=ARCHIVE_AFTER_DAYS):
+    """统计满足归档条件的记录数"""
+    cutoff = date.today() - timedelta(days=older_than_days)
+    return db.query(WorkRecord).filter(
+        WorkRecord.is_completed == 1,
+        WorkRecord.end_date < cutoff
+    ).count()
+
+def archive_completed_records(db, older_than_days=ARCHIVE_AFTER_DAYS, batch_size=ARCHIVE_BATCH_SIZE, max_batches=None):
+    """把结束日期早于指定天数的已完成记录分批迁移到归档表
+
+    每批独立提交：先按主键取一批ID，INSERT ... SELECT到归档表后删除原记录，
+    避免一次性大事务长时间锁表。已绑定团队时只归档该团队的记录。返回归档的记录数。
+    """
+    cutoff = date.today() - timedelta(days=older_than_days)
+    archived = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        ids = db.scalars(
+            select(WorkRecord.id)
+            .where(WorkRecord.is_completed == 1, WorkRecord.end_date < cutoff)
+            .order_by(WorkRecord.id)
+            .limit(batch_size)
+        ).all()
+        if not ids:
+            break
+
+        try:
+            archived_at = datetime.now()
+            source = select(
+                *[getattr(WorkRecord, column) for column in ARCHIVE_COLUMNS],
+                literal(archived_at).label("archived_at"),
+                literal(archived_at).label("updated_at")
+            ).where(WorkRecord.id.in_(ids))
+            db.execute(insert(WorkRecordArchive).from_select(ARCHIVE_COLUMNS + ["archived_at", "updated_at"], source))
+            db.execute(delete(WorkRecord).where(WorkRecord.id.in_(ids)))
+            backup_utils.record_deletes(db, WorkRecord.__tablename__, ids)
+            data_versions.bump_version(db, data_versions.WORK_RECORDS)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+
+        archived += len(ids)
+        batches += 1
+    return archived
+
+def main():
+    parser = argparse.ArgumentParser(description="归档已完成的旧工作记录")
+    parser.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="结束日期早于多少天的已完成记录")
+    parser.add_argument("--batch-size", type=int, default=ARCHIVE_BATCH_SIZE, help="每批迁移的记录数")
+    args = parser.parse_args()
+
+    import db_utils
+    db_utils.init_db()
+    db = next(db_utils.get_db_session())
+    archived = archive_completed_records(db, older_than_days=args.days, batch_size=args.batch_size)
+    print(f"已归档 {archived} 条记录")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,172 @@
+import asyncio
+import contextvars
+import threading
+from datetime import datetime
+
+from sqlalchemy import select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
+
+import db_utils
+import projections
+import resilience
+import rollup_utils
+import tenancy
+from models import WorkRecord, DutyPersonnel, User
+
+# 同步驱动到异步驱动的映射：生产环境MySQL用aiomysql，本地SQLite用aiosqlite
+ASYNC_DRIVERS = {
+    "mysql+pymysql": "mysql+aiomysql",
+    "mysql": "mysql+aiomysql",
+    "sqlite+pysqlite": "sqlite+aiosqlite",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+def to_async_uri(uri):
+    """把同步连接字符串转换为对应的异步驱动连接字符串"""
+    scheme, sep, rest = uri.partition("://")
+    return ASYNC_DRIVERS.get(scheme, scheme) + sep + rest
+
+# 异步引擎：写入仍走同步的db_utils，这里只提供只读查询
+async_engine = create_async_engine(to_async_uri(db_utils.DATABASE_URI), pool_pre_ping=True)
+async_replica_engines = [
+    create_async_engine(to_async_uri(uri), pool_pre_ping=True) for uri in db_utils.DATABASE_REPLICA_URIS
+]
+for _index, _replica in enumerate(async_replica_engines):
+    db_utils.install_replica_health(_replica.sync_engine, _index)
+
+# 异步连接同样需要执行连接初始化钩子（如SQLite的WAL和pragma设置）
+for _engine in [async_engine, *async_replica_engines]:
+    db_utils.install_connection_hooks(_engine.sync_engine)
+    if resilience.fault_injector.enabled:
+        resilience.fault_injector.install(_engine.sync_engine)
+
+# 当前请求是否需要读主库（读己之写），由run()从调用线程传入
+_prefer_primary = contextvars.ContextVar("prefer_primary", default=False)
+
+# 后台事件循环：连接池绑定在同一个循环上，Streamlit每次重跑都可以复用连接
+_loop = None
+_loop_lock = threading.Lock()
+
+def _get_loop():
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-db-loop", daemon=True).start()
+    return _loop
+
+def run(coro, prefer_primary=False):
+    """在后台事件循环中执行协程并等待结果，供Streamlit的同步代码调用
+
+    调用线程的读主库标记和所属团队随协程一起传入，查询同样只访问当前团队的数据；
+    结果要按数据版本缓存时传入prefer_primary=True，避免把副本上的旧数据缓存到新版本号下
+    """
+    prefer_primary = prefer_primary or db_utils.should_read_primary()
+    team_id = tenancy.current_team()
+
+    async def _runner():
+        _prefer_primary.set(prefer_primary)
+        tenancy.bind_team(team_id)
+        return await coro
+
+    return asyncio.run_coroutine_threadsafe(_runner(), _get_loop()).result()
+
+@resilience.resilient_read_async
+async def _read(fn):
+    """每个查询使用独立的会话，才能被asyncio.gather真正并发执行；副本失败时回退主库"""
+    engine = async_engine
+    if async_replica_engines and not _prefer_primary.get() and db_utils.replica_available(0):
+        engine = async_replica_engines[0]
+    try:
+        async with AsyncSession(engine) as db:
+            return await fn(db)
+    except DBAPIError:
+        if engine is async_engine:
+            raise
+        async with AsyncSession(async_engine) as db:
+            return await fn(db)
+
+async def _scalars(stmt):
+    async def fn(db):
+        return (await db.scalars(stmt)).all()
+    return await _read(fn)
+
+async def _rows(stmt):
+    async def fn(db):
+        return (await db.execute(stmt)).all()
+    return await _read(fn)
+
+# 工作记录查询，与db_utils中的同名函数语义一致
+async def get_records(skip=0, limit=100):
+    return await _scalars(select(WorkRecord).offset(skip).limit(limit))
+
+async def get_uncompleted_records(date=None):
+    query = select(WorkRecord).where(WorkRecord.is_completed == 0)
+    if date:
+        query = query.where(WorkRecord.end_date <= date)
+    return await _scalars(query.order_by(WorkRecord.end_date.asc()))
+
+async def get_records_by_date_range(start_date, end_date):
+    return await _scalars(select(WorkRecord).where(
+        WorkRecord.start_date >= start_date,
+        WorkRecord.end_date <= end_date
+    ))
+
+async def search_records(priority=None, is_completed=None, recorder=None, work_type=None):
+    query = select(WorkRecord)
+    if priority is not None:
+        query = query.where(WorkRecord.priority == priority)
+    if is_completed is not None:
+        query = query.where(WorkRecord.is_completed == is_completed)
+    if recorder:
+        query = query.where(WorkRecord.recorder.like(f"%{recorder}%"))
+    if work_type:
+        query = query.where(WorkRecord.work_type.like(f"%{work_type}%"))
+    return await _scalars(query)
+
+# 值班与用户查询
+async def get_all_duty_personnel():
+    return list(await _scalars(select(DutyPersonnel.name).order_by(DutyPersonnel.id)))
+
+async def get_duty_roster(day=None):
+    rows = await _rows(projections.duty_roster_select(day or datetime.now().date()))
+    return [projections.DutyRow._make(row) for row in rows]
+
+async def get_today_duty_rotation():
+    """与db_utils.get_today_duty_rotation相同：优先返回保存的今日值班，否则按日期轮换"""
+    today = datetime.now().date()
+    selected = db_utils.duty_for(today, await get_duty_roster(today))
+    return [selected.name] if selected else []
+
+async def get_all_users():
+    return await _scalars(select(User))
+
+# 统计聚合：读取每日汇总表，结果行数与总记录数无关
+async def count_records_by(field, start_date=None, end_date=None):
+    rows = await _rows(rollup_utils.totals_query(field, start_date, end_date))
+    return {key: int(count) for key, count in rows}
+
+async def load_dashboard():
+    """加载首页值班卡片需要的数据：值班名单和今日值班人员(DutyRow)来自同一次查询"""
+    today = datetime.now().date()
+    roster = await get_duty_roster(today)
+    return {
+        "today_duty": db_utils.duty_for(today, roster),
+        "duty_personnel": roster,
+    }
+
+async def load_statistics(start_date=None, end_date=None):
+    """并发执行统计页的四个汇总查询"""
+    by_work_type, by_recorder, by_priority, by_day = await asyncio.gather(
+        count_records_by("work_type", start_date, end_date),
+        count_records_by("recorder", start_date, end_date),
+        count_records_by("priority", start_date, end_date),
+        count_records_by("day", start_date, end_date),
+    )
+    return {
+        "by_work_type": by_work_type,
+        "by_recorder": by_recorder,
+        "by_priority": by_priority,
+        "by_day": by_day,
+    }
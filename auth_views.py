@@ -1,6 +1,8 @@
 import streamlit as st
 
 import db_utils
+import pending_summary
+import tenancy
 from auth_utils import *
 
 
@@ -34,12 +36,10 @@ def show_login_form():
                 st.session_state.jwt_token = token
                 st.session_state.username = username
                 st.query_params["token"] = token
+                bind_login_team(username)
                 
-                # 获取所有未完成记录
-                db = next(db_utils.get_db_session())
-                uncompleted = db_utils.get_uncompleted_records(db)
-                if uncompleted:
-                    st.session_state.pending_records = uncompleted
+                # 检查是否有未完成记录（读取本团队共享的待办摘要，需先绑定团队）
+                if pending_summary.get_pending_summary()["total"]:
                     st.session_state.show_pending_records = True
                     st.toast("⚠️ 检测到未完成工作，请及时处理！", icon='⚠️')
                 
@@ -48,6 +48,16 @@ def show_login_form():
             else:
                 st.error("用户名或密码错误")
 
+def bind_login_team(username):
+    """登录成功后绑定用户所属团队，与app.py的bind_user_team使用同一会话状态，之后的重跑不再查询"""
+    db = next(db_utils.get_read_session())
+    try:
+        team_id = db_utils.get_user_team_id(db, username)
+    finally:
+        db.close()
+    st.session_state.user_team = (username, tenancy.DEFAULT_TEAM_ID if team_id is None else team_id)
+    db_utils.bind_team(st.session_state.user_team[1])
+
 def show_register_form():
     """展示注册表单"""
     with st.form("register_form"):
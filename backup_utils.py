@@ -0,0 +1,276 @@
+import argparse
+import json
+import os
+import zipfile
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import Date, DateTime, bindparam, create_engine, delete, event, insert, or_, select, update
+from sqlalchemy.orm import Session
+
+from models import Base, DeletedRow
+
+# 增量备份文件的存放目录
+BACKUP_DIR = os.environ.get("BACKUP_DIR", "backups")
+# 增量备份从上次水位线之前多少秒开始取，覆盖备份时尚未提交的事务；恢复按主键覆盖写入，重复取到的行没有影响
+BACKUP_OVERLAP_SECONDS = float(os.environ.get("BACKUP_OVERLAP_SECONDS", "300"))
+# 恢复时每批写入的行数
+RESTORE_BATCH_SIZE = int(os.environ.get("RESTORE_BATCH_SIZE", "1000"))
+
+# 参与备份的表，按外键依赖排序；每日汇总表和数据版本表在恢复后重建
+BACKUP_TABLES = ["teams", "users", "work_records", "work_records_archive", "duty_personnel", "daily_duties"]
+MANIFEST = "manifest.json"
+TOMBSTONES = "deleted_rows.jsonl"
+
+# ---- 删除墓碑 ----
+
+def record_deletes(db, table_name, row_ids):
+    """在当前事务中为批量删除的行写入墓碑，随删除一起提交"""
+    if not row_ids:
+        return
+    now = datetime.now()
+    db.execute(insert(DeletedRow), [{"table_name": table_name, "row_id": row_id, "deleted_at": now}
+                                    for row_id in row_ids])
+
+@event.listens_for(Session, "before_flush")
+def _tombstone_orm_deletes(session, flush_context, instances):
+    """通过db.delete()删除的对象自动写入墓碑，批量DELETE需调用record_deletes"""
+    now = datetime.now()
+    for obj in session.deleted:
+        table_name = obj.__table__.name
+        if table_name in BACKUP_TABLES:
+            session.add(DeletedRow(table_name=table_name, row_id=obj.id, deleted_at=now))
+
+def prune_tombstones(db, before):
+    """删除早于before的墓碑：之后的增量备份都从更晚的水位线开始，不再需要它们"""
+    result = db.execute(delete(DeletedRow).where(DeletedRow.deleted_at < before))
+    db.commit()
+    return result.rowcount
+
+# ---- 备份 ----
+
+def _json_default(value):
+    return value.isoformat()
+
+def _write_jsonl(archive, name, rows):
+    count = 0
+    with archive.open(name, "w") as file:
+        for row in rows:
+            file.write((json.dumps(dict(row), ensure_ascii=False, default=_json_default) + "\n").encode("utf-8"))
+            count += 1
+    return count
+
+def list_backups(backup_dir=BACKUP_DIR):
+    """返回目录中所有备份的清单，按生成时间从旧到新排列"""
+    if not os.path.isdir(backup_dir):
+        return []
+    manifests = []
+    for filename in os.listdir(backup_dir):
+        if not filename.endswith(".zip"):
+            continue
+        try:
+            with zipfile.ZipFile(os.path.join(backup_dir, filename)) as archive:
+                manifests.append(json.loads(archive.read(MANIFEST)))
+        except (OSError, KeyError, ValueError, zipfile.BadZipFile):
+            continue
+    return sorted(manifests, key=lambda manifest: manifest["watermark"])
+
+def create_backup(db, kind="incremental", backup_dir=BACKUP_DIR):
+    """生成全量或增量备份zip并返回其清单；目录中还没有备份时增量备份自动改为全量
+
+    增量备份只导出updated_at不早于上次水位线（减去BACKUP_OVERLAP_SECONDS）的行和这段时间的删除墓碑。
+    所有表在同一个事务中读取，得到一致的快照。
+    """
+    backups = list_backups(backup_dir)
+    previous = backups[-1] if backups else None
+    if previous is None:
+        kind = "full"
+    started_at = datetime.now()
+    since = None
+    if kind == "incremental":
+        since = datetime.fromisoformat(previous["watermark"]) - timedelta(seconds=BACKUP_OVERLAP_SECONDS)
+
+    os.makedirs(backup_dir, exist_ok=True)
+    filename = f"backup_{started_at:%Y%m%d_%H%M%S_%f}_{kind}.zip"
+    path = os.path.join(backup_dir, filename)
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    counts = {}
+    with zipfile.ZipFile(temp_path, "w", zipfile.ZIP_DEFLATED) as archive:
+        for table_name in BACKUP_TABLES:
+            table = Base.metadata.tables[table_name]
+            stmt = select(table).order_by(table.c.id)
+            if since is not None:
+                stmt = stmt.where(table.c.updated_at >= since)
+            result = db.execute(stmt.execution_options(yield_per=RESTORE_BATCH_SIZE))
+            counts[table_name] = _write_jsonl(archive, f"{table_name}.jsonl", result.mappings())
+        tombstones = 0
+        if since is not None:
+            tombstone_table = DeletedRow.__table__
+            result = db.execute(select(tombstone_table.c.table_name, tombstone_table.c.row_id,
+                                       tombstone_table.c.deleted_at)
+                                .where(tombstone_table.c.deleted_at >= since).order_by(tombstone_table.c.id))
+            tombstones = _write_jsonl(archive, TOMBSTONES, result.mappings())
+        manifest = {
+            "file": filename,
+            "kind": kind,
+            "watermark": started_at.isoformat(),
+            "since": since.isoformat() if since else None,
+            "parent": previous["file"] if kind == "incremental" else None,
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+            "tables": counts,
+            "tombstones": tombstones,
+        }
+        archive.writestr(MANIFEST, json.dumps(manifest, ensure_ascii=False))
+    os.replace(temp_path, path)
+    # 结束读取快照所在的事务，再清理墓碑
+    db.rollback()
+    prune_tombstones(db, started_at - timedelta(seconds=BACKUP_OVERLAP_SECONDS))
+    return manifest
+
+# ---- 恢复 ----
+
+def restore_chain(backup_dir=BACKUP_DIR, upto=None):
+    """恢复所需的备份链：upto（默认最新备份）之前最近一次全量备份及其后的增量备份"""
+    manifests = list_backups(backup_dir)
+    if upto is not None:
+        files = [manifest["file"] for manifest in manifests]
+        if upto not in files:
+            raise ValueError(f"找不到备份 {upto}")
+        manifests = manifests[:files.index(upto) + 1]
+    fulls = [index for index, manifest in enumerate(manifests) if manifest["kind"] == "full"]
+    if not fulls:
+        raise ValueError("没有可用的全量备份")
+    chain = manifests[fulls[-1]:]
+    for previous, manifest in zip(chain, chain[1:]):
+        if manifest["parent"] != previous["file"]:
+            raise ValueError(f"备份链不完整：{manifest['file']} 的上一个备份应为 {manifest['parent']}")
+    return chain
+
+def _model_for(table_name):
+    for mapper in Base.registry.mappers:
+        if mapper.local_table.name == table_name:
+            return mapper.class_
+    raise KeyError(table_name)
+
+def _read_batches(archive, name, table):
+    """逐批读取jsonl，日期和时间字段按列类型还原"""
+    converters = {}
+    for column in table.columns:
+        if isinstance(column.type, DateTime):
+            converters[column.name] = datetime.fromisoformat
+        elif isinstance(column.type, Date):
+            converters[column.name] = date.fromisoformat
+    if name not in archive.namelist():
+        return
+    batch = []
+    with archive.open(name) as file:
+        for line in file:
+            row = json.loads(line)
+            for column, convert in converters.items():
+                if row.get(column) is not None:
+                    row[column] = convert(row[column])
+            batch.append(row)
+            if len(batch) >= RESTORE_BATCH_SIZE:
+                yield batch
+                batch = []
+    if batch:
+        yield batch
+
+def _upsert(db, model, rows):
+    """按主键覆盖写入：已存在的行批量UPDATE，其余批量INSERT"""
+    ids = [row["id"] for row in rows]
+    existing = set(db.scalars(select(model.id).where(model.id.in_(ids))))
+    updates = [row for row in rows if row["id"] in existing]
+    inserts = [row for row in rows if row["id"] not in existing]
+    if updates:
+        # 参数中包含updated_at和row_version，不会触发onupdate
+        db.execute(update(model), updates)
+    if inserts:
+        db.execute(insert(model.__table__), inserts)
+
+def _legacy_duty_rows(db, rows):
+    """值班安排改为按人员ID引用之前生成的备份按姓名保存值班人员，恢复时按 团队+姓名 换成人员ID"""
+    if "personnel" not in rows[0]:
+        return rows
+    personnel = Base.metadata.tables["duty_personnel"]
+    ids = {(team_id, name): person_id for person_id, team_id, name
+           in db.execute(select(personnel.c.id, personnel.c.team_id, personnel.c.name))}
+    for row in rows:
+        row["personnel_id"] = ids.get((row["team_id"], row.pop("personnel")))
+    return rows
+
+def _apply_backup(db, archive, manifest):
+    if manifest["kind"] == "full":
+        for table_name in reversed(BACKUP_TABLES):
+            db.execute(delete(Base.metadata.tables[table_name]))
+    for table_name in BACKUP_TABLES:
+        model = _model_for(table_name)
+        for rows in _read_batches(archive, f"{table_name}.jsonl", model.__table__):
+            if table_name == "daily_duties":
+                rows = _legacy_duty_rows(db, rows)
+            if manifest["kind"] == "full":
+                # 用Core插入，updated_at等为空的值原样写入，不触发列默认值
+                db.execute(insert(model.__table__), rows)
+            else:
+                _upsert(db, model, rows)
+
+    # 墓碑只删除在删除时间之前修改过的行，同一主键之后重新写入的行保留
+    tombstones = {}
+    for rows in _read_batches(archive, TOMBSTONES, DeletedRow.__table__):
+        for row in rows:
+            tombstones.setdefault(row["table_name"], []).append(row)
+    for table_name in reversed(BACKUP_TABLES):
+        if table_name not in tombstones:
+            continue
+        table = Base.metadata.tables[table_name]
+        db.execute(
+            delete(table).where(
+                table.c.id == bindparam("row_id"),
+                or_(table.c.updated_at.is_(None), table.c.updated_at <= bindparam("deleted_at"))
+            ),
+            [{"row_id": row["row_id"], "deleted_at": row["deleted_at"]} for row in tombstones[table_name]]
+        )
+
+def restore(target_uri, chain, backup_dir=BACKUP_DIR):
+    """把全量备份和之后的增量备份依次恢复到target_uri，最后重建每日汇总表和数据版本"""
+    import data_versions
+    import rollup_utils
+
+    target = create_engine(target_uri)
+    Base.metadata.create_all(bind=target)
+    with Session(target) as db:
+        for manifest in chain:
+            with zipfile.ZipFile(os.path.join(backup_dir, manifest["file"])) as archive:
+                _apply_backup(db, archive, manifest)
+        db.commit()
+        data_versions.seed_versions(db)
+        rollup_utils.rebuild_daily_stats(db)
+    target.dispose()
+
+def main():
+    parser = argparse.ArgumentParser(description="基于变更跟踪的全量/增量备份与恢复")
+    parser.add_argument("command", choices=["full", "incremental", "list", "restore"])
+    parser.add_argument("--dir", default=BACKUP_DIR, help="备份目录")
+    parser.add_argument("--target", help="restore: 恢复到的数据库连接字符串")
+    parser.add_argument("--upto", help="restore: 恢复到哪个备份文件为止，默认最新")
+    args = parser.parse_args()
+
+    if args.command == "list":
+        for manifest in list_backups(args.dir):
+            rows = sum(manifest["tables"].values())
+            print(f"{manifest['watermark'][:19]}  {manifest['kind']:<11} 行 {rows:>8}  "
+                  f"墓碑 {manifest['tombstones']:>6}  {manifest['file']}")
+    elif args.command == "restore":
+        if not args.target:
+            parser.error("restore需要--target")
+        chain = restore_chain(args.dir, args.upto)
+        restore(args.target, chain, args.dir)
+        print(f"已依次恢复 {len(chain)} 个备份: {', '.join(manifest['file'] for manifest in chain)}")
+    else:
+        import db_utils
+        db_utils.init_db()
+        db = next(db_utils.get_db_session())
+        manifest = create_backup(db, args.command, args.dir)
+        print(f"已生成{manifest['kind']}备份 {manifest['file']}: {manifest['tables']}，墓碑 {manifest['tombstones']}")
+
+if __name__ == "__main__":
+    main()
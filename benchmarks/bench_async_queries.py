@@ -0,0 +1,81 @@
+"""对比首页查询的同步顺序执行与异步并发执行耗时"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# 未设置DATABASE_URI时使用临时SQLite文件；设置为MySQL连接字符串可测试真实网络延迟下的效果
+if "DATABASE_URI" not in os.environ:
+    os.environ["DATABASE_URI"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import async_db_utils
+import db_utils
+import rollup_utils
+from models import WorkRecord
+
+def seed(count):
+    db = next(db_utils.get_db_session())
+    if db.query(WorkRecord).count() >= count:
+        return
+    today = date.today()
+    rows = []
+    for i in range(count):
+        start = today - timedelta(days=random.randint(0, 730))
+        rows.append({
+            "recorder": f"人员{i % 25}",
+            "work_type": f"类型{i % 12}",
+            "work_content": f"工作内容{i}",
+            "start_date": start,
+            "end_date": start + timedelta(days=random.randint(0, 30)),
+            "is_completed": random.randint(0, 1),
+            "priority": random.randint(1, 3),
+        })
+    db_utils.apply_record_changes(db, inserts=rows)
+    for name in ("张三", "李四", "王五"):
+        db_utils.add_duty_person(db, name)
+
+def run_sync():
+    db = next(db_utils.get_read_session())
+    db_utils.get_today_duty_rotation(db)
+    db_utils.get_all_duty_personnel(db)
+    for field in ("work_type", "recorder", "priority", "day"):
+        rollup_utils.get_totals_by(db, field)
+
+async def run_async():
+    await async_db_utils.load_dashboard()
+    await async_db_utils.load_statistics()
+
+def timeit(fn, rounds):
+    samples = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples[len(samples) // 2], samples[-1]
+
+def main():
+    parser = argparse.ArgumentParser(description="对比首页查询的同步顺序执行与异步并发执行耗时")
+    parser.add_argument("--records", type=int, default=20000)
+    parser.add_argument("--rounds", type=int, default=20)
+    args = parser.parse_args()
+
+    db_utils.init_db()
+    seed(args.records)
+
+    # 预热连接池
+    run_sync()
+    async_db_utils.run(run_async())
+
+    sync_median, sync_max = timeit(run_sync, args.rounds)
+    async_median, async_max = timeit(lambda: async_db_utils.run(run_async()), args.rounds)
+    print(f"数据库: {db_utils.engine.url.render_as_string(hide_password=True)}，记录数: {args.records}")
+    print(f"同步顺序执行  中位数 {sync_median * 1000:8.2f} ms  最大 {sync_max * 1000:8.2f} ms")
+    print(f"异步并发执行  中位数 {async_median * 1000:8.2f} ms  最大 {async_max * 1000:8.2f} ms")
+
+if __name__ == "__main__":
+    main()
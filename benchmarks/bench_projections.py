@@ -0,0 +1,81 @@
+"""对比ORM实体、只读行对象和列式DataFrame在列表查询中的内存占用和加载耗时"""
+import argparse
+import gc
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import date, timedelta
+
+# 未设置DATABASE_URI时使用临时SQLite文件
+if "DATABASE_URI" not in os.environ:
+    os.environ["DATABASE_URI"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd
+
+import db_utils
+import projections
+from models import WorkRecord
+
+def seed(count):
+    db = next(db_utils.get_db_session())
+    existing = db.query(WorkRecord).count()
+    today = date.today()
+    rows = [{
+        "recorder": f"人员{i % 25}",
+        "work_type": f"类型{i % 12}",
+        "work_content": f"工作内容{i}",
+        "start_date": today - timedelta(days=i % 730),
+        "end_date": today - timedelta(days=i % 730) + timedelta(days=i % 30),
+        "is_completed": i % 2,
+        "priority": i % 3 + 1,
+    } for i in range(existing, count)]
+    for start in range(0, len(rows), 10000):
+        db_utils.apply_record_changes(db, inserts=rows[start:start + 10000])
+
+def measure(label, load):
+    """Arrow列缓冲区由pyarrow内存池分配，不计入tracemalloc统计，列式表格的内存以峰值为准"""
+    gc.collect()
+    db = next(db_utils.get_read_session())
+    tracemalloc.start()
+    started = time.perf_counter()
+    rows = load(db)
+    elapsed = time.perf_counter() - started
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    per_100k = 100000 / max(len(rows), 1)
+    print(f"{label:<14} 行数 {len(rows):>7}  耗时 {elapsed * per_100k * 1000:8.1f} ms/10万行  "
+          f"常驻 {retained * per_100k / 2 ** 20:7.1f} MiB/10万行  峰值 {peak * per_100k / 2 ** 20:7.1f} MiB/10万行")
+    del rows
+    db.close()
+
+def row_dict_frame(db):
+    """旧的表格构建方式：逐行生成字典并在Python中翻译标签"""
+    return pd.DataFrame([{
+        "ID": r.id,
+        "记录人": r.recorder,
+        "工作类型": r.work_type,
+        "工作内容": r.work_content,
+        "开始日期": r.start_date,
+        "结束日期": r.end_date,
+        "是否完成": "是" if r.is_completed else "否",
+        "优先级": projections.PRIORITY_LABELS.get(r.priority, "未知"),
+    } for r in projections.fetch_rows(db, projections.record_select())])
+
+def main():
+    parser = argparse.ArgumentParser(description="对比列表查询各种结果形式的内存占用和加载耗时")
+    parser.add_argument("--records", type=int, default=100000)
+    args = parser.parse_args()
+
+    db_utils.init_db()
+    seed(args.records)
+
+    measure("ORM实体", lambda db: db.query(WorkRecord).all())
+    measure("只读行对象", lambda db: projections.fetch_rows(db, projections.record_select()))
+    measure("逐行字典表格", row_dict_frame)
+    measure("列式表格", lambda db: projections.display_frame(projections.search_record_frame(db)))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""测量冷启动导入耗时和每次重跑耗时，对比一次性初始化与延迟导入前后的差异"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import warnings
+
+# 未设置DATABASE_URI时使用临时SQLite文件
+if "DATABASE_URI" not in os.environ:
+    os.environ["DATABASE_URI"] = f"sqlite:///{tempfile.mkdtemp()}/bench.db"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+COLD_IMPORT = """
+import time
+import warnings
+started = time.perf_counter()
+import work_record_views
+{extra}
+print(time.perf_counter() - started)
+"""
+
+def cold_import(extra, rounds):
+    """在新解释器中导入页面模块，“之前”同时导入plotly.express和openpyxl"""
+    timings = []
+    for _ in range(rounds):
+        output = subprocess.run(
+            [sys.executable, "-c", COLD_IMPORT.format(extra=extra)],
+            cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return statistics.median(timings)
+
+def rerun_timings(rounds, clear_bootstrap):
+    """用AppTest重复执行首页，“之前”在每次执行前清空bootstrap缓存，使init_db每次都运行"""
+    from streamlit.testing.v1 import AppTest
+
+    import auth_utils
+    import bootstrap
+
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=60)
+    at.session_state["jwt_token"] = auth_utils.generate_jwt_token("admin")
+    at.run()
+    timings = []
+    for _ in range(rounds):
+        if clear_bootstrap:
+            bootstrap.startup.clear()
+        started = time.perf_counter()
+        at.run()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="测量冷启动导入耗时和每次重跑耗时")
+    parser.add_argument("--rounds", type=int, default=10)
+    args = parser.parse_args()
+    warnings.filterwarnings("ignore")
+
+    import auth_utils
+    import db_utils
+
+    db_utils.init_db()
+    db = next(db_utils.get_db_session())
+    if not db_utils.get_user_by_username(db, "admin"):
+        auth_utils.create_user("admin", "admin")
+
+    eager = cold_import("import plotly.express\nimport openpyxl", args.rounds)
+    lazy = cold_import("", args.rounds)
+    print(f"冷启动导入  之前 {eager * 1000:7.1f} ms  之后 {lazy * 1000:7.1f} ms")
+
+    started = time.perf_counter()
+    for _ in range(args.rounds):
+        db_utils.init_db()
+    print(f"init_db单次耗时 {(time.perf_counter() - started) / args.rounds * 1000:7.1f} ms")
+
+    before = rerun_timings(args.rounds, clear_bootstrap=True)
+    after = rerun_timings(args.rounds, clear_bootstrap=False)
+    print(f"首页重跑    之前 {before * 1000:7.1f} ms  之后 {after * 1000:7.1f} ms")
+
+if __name__ == "__main__":
+    main()
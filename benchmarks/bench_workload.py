@@ -0,0 +1,51 @@
+"""测量负荷矩阵的计算耗时：差分数组向量化实现 vs 逐条逐天循环"""
+import argparse
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import workload_utils
+
+def main():
+    parser = argparse.ArgumentParser(description="测量负荷矩阵的计算耗时，只包含内存中的计算，不包含数据库查询")
+    parser.add_argument("--records", type=int, default=1000000)
+    parser.add_argument("--years", type=int, default=3)
+    parser.add_argument("--recorders", type=int, default=200)
+    parser.add_argument("--max-span", type=int, default=30, help="单条记录最长跨越天数")
+    parser.add_argument("--naive-sample", type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    window_start = date.today() - timedelta(days=365 * args.years)
+    window_end = date.today()
+    days = (window_end - window_start).days
+    starts = np.datetime64(window_start) + rng.integers(0, days, args.records).astype("timedelta64[D]")
+    ends = starts + rng.integers(0, args.max_span, args.records).astype("timedelta64[D]")
+    names = np.array([f"人员{i}" for i in range(args.recorders)])
+    recorders = names[rng.integers(0, args.recorders, args.records)]
+
+    started = time.perf_counter()
+    matrix = workload_utils.workload_matrix(recorders, starts, ends, window_start, window_end)
+    vectorized = time.perf_counter() - started
+    print(f"向量化   {args.records:>8} 条  {vectorized * 1000:8.1f} ms  矩阵 {matrix.shape[0]} × {matrix.shape[1]}")
+
+    # 循环实现在子集上运行后按记录数线性外推
+    sample = min(args.naive_sample, args.records)
+    sample_starts = [pd.Timestamp(value).date() for value in starts[:sample]]
+    sample_ends = [pd.Timestamp(value).date() for value in ends[:sample]]
+    started = time.perf_counter()
+    expected = workload_utils.naive_workload(recorders[:sample], sample_starts, sample_ends, window_start, window_end)
+    naive = (time.perf_counter() - started) * args.records / sample
+    print(f"逐条循环 {args.records:>8} 条  {naive * 1000:8.1f} ms  （由 {sample} 条外推）")
+
+    check = workload_utils.workload_matrix(recorders[:sample], starts[:sample], ends[:sample], window_start, window_end)
+    assert (check.reindex(expected.index).to_numpy() == expected.to_numpy()).all(), "两种实现结果不一致"
+
+if __name__ == "__main__":
+    main()
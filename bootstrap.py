@@ -0,0 +1,21 @@
+import time
+
+import streamlit as st
+
+import api_server
+import db_utils
+import report_utils
+
+@st.cache_resource(show_spinner=False)
+def startup():
+    """每个进程只执行一次的初始化：建表、补索引、初始化版本号和汇总表，启动报表调度线程和JSON接口
+
+    Streamlit每次交互都会从头执行app.py，初始化放在cache_resource中，
+    后续重跑直接返回缓存结果，不再检查表结构
+    """
+    started = time.perf_counter()
+    db_utils.init_db()
+    init_seconds = time.perf_counter() - started
+    report_utils.start_scheduler()
+    api_server.start_server()
+    return {"init_seconds": init_seconds}
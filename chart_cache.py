@@ -0,0 +1,74 @@
+import os
+import threading
+
+import numpy as np
+from cachetools import LRUCache
+
+import tenancy
+
+# 缓存的图表和统计数据条数上限
+CHART_CACHE_SIZE = int(os.environ.get("CHART_CACHE_SIZE", "128"))
+# 单条折线发送到浏览器的最大点数，超出时在服务端降采样
+CHART_MAX_POINTS = int(os.environ.get("CHART_MAX_POINTS", "1000"))
+# 点数超过该值时使用WebGL渲染
+WEBGL_THRESHOLD = int(os.environ.get("CHART_WEBGL_THRESHOLD", "500"))
+
+_cache = LRUCache(maxsize=CHART_CACHE_SIZE)
+_lock = threading.Lock()
+# 未命中标记：builder可能合法地返回None（如没有数据时的图表），不能用None判断是否已缓存
+_MISSING = object()
+
+def cached(name, version, params, builder):
+    """按 (名称, 数据版本, 筛选参数, 当前团队) 缓存builder的结果，数据版本变化后自动失效
+
+    params需为可哈希的元组；builder为无参函数，只在未命中时调用，返回None时同样缓存
+    """
+    key = (name, version, params, tenancy.current_team())
+    with _lock:
+        value = _cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = builder()
+        with _lock:
+            _cache[key] = value
+    return value
+
+def clear():
+    with _lock:
+        _cache.clear()
+
+def downsample_lttb(x, y, max_points=CHART_MAX_POINTS):
+    """Largest-Triangle-Three-Buckets降采样，保留折线的峰谷形状
+
+    x为数值或datetime64数组，y为数值数组；点数不超过max_points时原样返回
+    """
+    x = np.asarray(x)
+    y = np.asarray(y, dtype="float64")
+    n = len(x)
+    if n <= max_points or max_points < 3:
+        return x, y
+
+    xs = x.astype("datetime64[ns]").astype("int64").astype("float64") if np.issubdtype(x.dtype, np.datetime64) \
+        else x.astype("float64")
+    selected = np.empty(max_points, dtype="int64")
+    selected[0] = 0
+    selected[-1] = n - 1
+    # 除首尾点外，其余点平均分到max_points-2个桶中
+    edges = np.linspace(1, n - 1, max_points - 1).astype("int64")
+    previous = 0
+    for i in range(max_points - 2):
+        start, end = edges[i], edges[i + 1]
+        next_start, next_end = edges[i + 1], edges[i + 2] if i + 2 < len(edges) else n
+        avg_x = xs[next_start:next_end].mean()
+        avg_y = y[next_start:next_end].mean()
+        # 选择与前一个选中点、下一桶平均点构成三角形面积最大的点
+        areas = np.abs(
+            (xs[previous] - avg_x) * (y[start:end] - y[previous])
+            - (xs[previous] - xs[start:end]) * (avg_y - y[previous])
+        )
+        previous = start + int(areas.argmax())
+        selected[i + 1] = previous
+    return x[selected], y[selected]
+
+def render_mode(point_count):
+    """长序列使用WebGL渲染，避免浏览器绘制大量SVG节点"""
+    return "webgl" if point_count > WEBGL_THRESHOLD else "svg"
@@ -0,0 +1,112 @@
+import argparse
+import os
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import select, insert, update
+from sqlalchemy.exc import IntegrityError
+
+import resilience
+from models import DataVersion
+
+# 版本号按数据类别划分
+WORK_RECORDS = "work_records"
+DUTY = "duty"
+USERS = "users"
+ENTITIES = (WORK_RECORDS, DUTY, USERS)
+
+# 每个进程最多每隔多少秒读取一次版本表
+VERSION_POLL_SECONDS = float(os.environ.get("DATA_VERSION_POLL_SECONDS", "2"))
+
+_versions = {entity: 0 for entity in ENTITIES}
+_next_poll_at = 0.0
+_poll_lock = threading.Lock()
+
+def bump_version(db, entity):
+    """在当前事务中递增某类数据的版本号，随写入一起提交"""
+    values = {"version": DataVersion.version + 1, "updated_at": datetime.now()}
+    result = db.execute(
+        update(DataVersion).where(DataVersion.entity == entity).values(**values)
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        try:
+            with db.begin_nested():
+                db.execute(insert(DataVersion).values(entity=entity, version=1, updated_at=datetime.now()))
+        except IntegrityError:
+            db.execute(
+                update(DataVersion).where(DataVersion.entity == entity).values(**values)
+                .execution_options(synchronize_session=False)
+            )
+    # 提交后让本进程立即重新读取版本号，保证写入者能看到自己的修改
+    db.info.setdefault("bumped_entities", set()).add(entity)
+
+def seed_versions(db):
+    """确保每类数据都有版本行"""
+    existing = set(db.scalars(select(DataVersion.entity)))
+    missing = [entity for entity in ENTITIES if entity not in existing]
+    if missing:
+        db.execute(insert(DataVersion), [{"entity": entity, "version": 0} for entity in missing])
+        db.commit()
+
+def invalidate():
+    """下一次get_versions时强制重新读取版本表"""
+    global _next_poll_at
+    _next_poll_at = 0.0
+
+def get_versions(session_factory):
+    """返回各类数据的版本号，每个进程最多每VERSION_POLL_SECONDS秒查询一次数据库"""
+    global _next_poll_at
+    if time.monotonic() < _next_poll_at:
+        return dict(_versions)
+    # 已有线程在查询时直接返回上一次的结果，避免并发重跑同时打到数据库
+    if not _poll_lock.acquire(blocking=False):
+        return dict(_versions)
+    try:
+        db = session_factory()
+        try:
+            rows = _read_versions(db)
+        except Exception as exc:
+            # 数据库不可用时沿用上一次的版本号，下个周期再试
+            if not (isinstance(exc, resilience.CircuitOpenError) or resilience.is_transient(exc)):
+                raise
+            rows = []
+        finally:
+            db.close()
+        _versions.update({entity: version for entity, version in rows})
+        _next_poll_at = time.monotonic() + VERSION_POLL_SECONDS
+    finally:
+        _poll_lock.release()
+    return dict(_versions)
+
+@resilience.resilient_read(attempts=1)
+def _read_versions(db):
+    return db.execute(select(DataVersion.entity, DataVersion.version)).all()
+
+def main():
+    parser = argparse.ArgumentParser(description="查看或递增共享数据版本号，可用于多进程缓存失效测试")
+    parser.add_argument("command", choices=["show", "bump", "watch"])
+    parser.add_argument("entity", nargs="?", default=WORK_RECORDS, choices=ENTITIES)
+    args = parser.parse_args()
+
+    import db_utils
+    db_utils.init_db()
+    if args.command == "bump":
+        db = next(db_utils.get_db_session())
+        bump_version(db, args.entity)
+        db.commit()
+        print(get_versions(db_utils.SessionLocal))
+    elif args.command == "show":
+        print(get_versions(db_utils.SessionLocal))
+    else:
+        # 每个轮询周期打印一次，版本变化时标记出来
+        last = None
+        while True:
+            current = get_versions(db_utils.SessionLocal)
+            print(("* " if last is not None and current != last else "  ") + str(current), flush=True)
+            last = current
+            time.sleep(VERSION_POLL_SECONDS)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import functools
+import os
+
+import streamlit as st
+
+import data_versions
+import db_utils
+
+# 自动刷新片段检查数据版本的间隔（秒），0为关闭自动刷新
+LIVE_REFRESH_SECONDS = float(os.environ.get("LIVE_REFRESH_SECONDS", "10"))
+
+def _rebind_session():
+    """片段单独重跑时不经过app.py顶部的绑定，按会话状态重新绑定用户和团队"""
+    if "username" in st.session_state:
+        db_utils.bind_actor(st.session_state.username)
+    if "user_team" in st.session_state:
+        db_utils.bind_team(st.session_state.user_team[1])
+
+def live_fragment(entity=data_versions.WORK_RECORDS, interval=LIVE_REFRESH_SECONDS):
+    """装饰器：把页面片段包装为定时重跑的st.fragment，其他用户写入后自动显示最新数据
+
+    定时重跑只重跑该片段，不重跑整个页面。片段函数接收当前数据版本号作为第一个参数，
+    应以它为键缓存查询结果：版本号来自进程内每DATA_VERSION_POLL_SECONDS秒最多读取一次的版本表，
+    数据未变化时重跑只是重新渲染缓存的数据，不查询业务表
+    """
+    def decorator(fn):
+        @st.fragment(run_every=interval if interval > 0 else None)
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            _rebind_session()
+            return fn(db_utils.get_data_version(entity), *args, **kwargs)
+        return wrapper
+    return decorator
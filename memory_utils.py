@@ -0,0 +1,217 @@
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import types
+import weakref
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import streamlit as st
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from streamlit.runtime.scriptrunner import get_script_run_ctx
+
+# 每个会话最多每隔多少秒重新统计一次session_state占用
+SESSION_MEMORY_SAMPLE_SECONDS = float(os.environ.get("SESSION_MEMORY_SAMPLE_SECONDS", "30"))
+# 超过该秒数未更新的会话视为已关闭，从统计中移除
+SESSION_STALE_SECONDS = float(os.environ.get("SESSION_STALE_SECONDS", "1800"))
+# tracemalloc每个分配点记录的调用栈深度，越深越容易定位调用方，开销也越大
+TRACEMALLOC_FRAMES = int(os.environ.get("TRACEMALLOC_FRAMES", "1"))
+# 进程内最多保留的tracemalloc快照数量，超出时丢弃最早的快照
+MEMORY_SNAPSHOT_LIMIT = int(os.environ.get("MEMORY_SNAPSHOT_LIMIT", "5"))
+
+_SKIP_TYPES = (type, types.ModuleType, types.FunctionType, types.BuiltinFunctionType, types.MethodType)
+
+_sessions = {}
+_lock = threading.Lock()
+# 开始过事务的数据库Session，对象被回收后自动移除
+_db_sessions = weakref.WeakSet()
+_snapshots = []
+
+def deep_sizeof(obj, seen=None):
+    """递归估算对象及其引用内容占用的字节数，同一对象只计算一次
+
+    DataFrame和ndarray按数据缓冲区计算；ORM对象跳过_sa_开头的内部状态，避免把Session和引擎也算进去
+    """
+    seen = set() if seen is None else seen
+    if id(obj) in seen or isinstance(obj, _SKIP_TYPES):
+        return 0
+    seen.add(id(obj))
+
+    if isinstance(obj, (pd.DataFrame, pd.Series, pd.Index)):
+        usage = obj.memory_usage(deep=True)
+        return int(usage.sum()) if isinstance(usage, pd.Series) else int(usage)
+    if isinstance(obj, np.ndarray):
+        return sys.getsizeof(obj) + (obj.nbytes if obj.base is None else 0)
+
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen) for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    elif hasattr(obj, "__dict__"):
+        size += sum(deep_sizeof(value, seen) for key, value in vars(obj).items() if not key.startswith("_sa_"))
+    elif hasattr(obj, "__slots__"):
+        size += sum(deep_sizeof(getattr(obj, slot), seen) for slot in obj.__slots__ if hasattr(obj, slot))
+    return size
+
+def _current_session_id():
+    ctx = get_script_run_ctx()
+    return ctx.session_id if ctx else None
+
+def record_session(username=None):
+    """统计当前会话session_state的占用并登记到进程内注册表，按SESSION_MEMORY_SAMPLE_SECONDS节流"""
+    session_id = _current_session_id()
+    if session_id is None:
+        return None
+    now = time.monotonic()
+    with _lock:
+        entry = _sessions.get(session_id)
+        if entry and now - entry["sampled_at"] < SESSION_MEMORY_SAMPLE_SECONDS:
+            entry["seen_at"] = now
+            return entry
+
+    state = st.session_state.to_dict()
+    # 各键共用seen，多个键引用的同一对象只计入第一个键，各键之和即为总占用
+    seen = set()
+    key_bytes = {str(key): deep_sizeof(value, seen) for key, value in state.items()}
+    entry = {
+        "session_id": session_id,
+        "username": username,
+        "bytes": sys.getsizeof(state) + sum(key_bytes.values()),
+        "keys": len(state),
+        "key_bytes": dict(sorted(key_bytes.items(), key=lambda item: item[1], reverse=True)),
+        "sampled_at": now,
+        "seen_at": now,
+        "updated_at": datetime.now(),
+    }
+    with _lock:
+        _sessions[session_id] = entry
+    return entry
+
+def session_footprints():
+    """返回仍在活动的会话占用列表（按占用从大到小），并清理过期会话"""
+    cutoff = time.monotonic() - SESSION_STALE_SECONDS
+    with _lock:
+        for session_id in [key for key, entry in _sessions.items() if entry["seen_at"] < cutoff]:
+            del _sessions[session_id]
+        entries = [dict(entry) for entry in _sessions.values()]
+    return sorted(entries, key=lambda entry: entry["bytes"], reverse=True)
+
+def format_bytes(size):
+    for unit in ("B", "KiB", "MiB"):
+        if size < 1024:
+            return f"{size:.0f} {unit}" if unit == "B" else f"{size:.1f} {unit}"
+        size /= 1024
+    return f"{size:.1f} GiB"
+
+# ---- 进程与数据库连接 ----
+
+def process_rss():
+    """当前进程的常驻内存字节数，无法读取/proc时返回历史峰值"""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+@event.listens_for(Session, "after_begin")
+def _track_db_session(session, transaction, connection):
+    _db_sessions.add(session)
+
+def db_session_counts():
+    """仍未被回收的数据库Session数量，以及其中仍持有事务（占用连接）的数量
+
+    next(get_db_session())取得的会话要等生成器被回收才会关闭，两个数字持续增长说明有会话泄漏
+    """
+    sessions = list(_db_sessions)
+    return {"alive": len(sessions), "in_transaction": sum(1 for session in sessions if session.in_transaction())}
+
+def pool_stats(engines):
+    """各引擎连接池的状态，engines为 {名称: Engine}"""
+    rows = []
+    for name, engine in engines.items():
+        pool = engine.pool
+        rows.append({
+            "引擎": name,
+            "连接池": type(pool).__name__,
+            "池大小": _pool_value(pool, "size"),
+            "已借出": _pool_value(pool, "checkedout"),
+            "空闲": _pool_value(pool, "checkedin"),
+            "溢出": _pool_value(pool, "overflow"),
+        })
+    return rows
+
+def _pool_value(pool, name):
+    # 不同类型的连接池提供的统计方法不同
+    method = getattr(pool, name, None)
+    return method() if callable(method) else None
+
+# ---- tracemalloc快照 ----
+
+def start_tracing(frames=TRACEMALLOC_FRAMES):
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+
+def stop_tracing():
+    """停止追踪并丢弃已有快照，快照只能和同一次追踪期间的快照比较"""
+    tracemalloc.stop()
+    with _lock:
+        _snapshots.clear()
+
+def take_snapshot(label=None):
+    """拍摄tracemalloc快照并保存在进程内，排除tracemalloc自身和导入机制的分配"""
+    if not tracemalloc.is_tracing():
+        raise RuntimeError("尚未开始内存追踪")
+    snapshot = tracemalloc.take_snapshot().filter_traces([
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ])
+    entry = {
+        "label": label or f"快照{datetime.now():%H:%M:%S}",
+        "taken_at": datetime.now(),
+        "snapshot": snapshot,
+        "traced_bytes": sum(stat.size for stat in snapshot.statistics("filename")),
+        "rss": process_rss(),
+    }
+    with _lock:
+        _snapshots.append(entry)
+        del _snapshots[:-MEMORY_SNAPSHOT_LIMIT]
+    return entry
+
+def snapshots():
+    with _lock:
+        return list(_snapshots)
+
+def _location(traceback):
+    frame = traceback[0]
+    filename = frame.filename
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and filename.startswith(prefix + os.sep):
+            filename = filename[len(prefix) + 1:]
+            break
+    return f"{filename}:{frame.lineno}"
+
+def top_allocations(snapshot, limit=20):
+    """按分配位置汇总，返回占用最大的limit个位置"""
+    return [{
+        "位置": _location(stat.traceback),
+        "大小": stat.size,
+        "块数": stat.count,
+    } for stat in snapshot.statistics("lineno")[:limit]]
+
+def diff_snapshots(old, new, limit=20):
+    """比较两个快照，返回增长（或减少）最多的limit个分配位置"""
+    return [{
+        "位置": _location(stat.traceback),
+        "大小": stat.size,
+        "变化": stat.size_diff,
+        "块数": stat.count,
+        "块数变化": stat.count_diff,
+    } for stat in new.compare_to(old, "lineno")[:limit]]
@@ -1,9 +1,32 @@
-from sqlalchemy import Column, Integer, String, Date
+from datetime import datetime
+
+from sqlalchemy import Column, ForeignKey, Integer, String, Date, DateTime, Index, UniqueConstraint, literal_column, text
 from sqlalchemy.ext.declarative import declarative_base
 
+import tenancy
+
 Base = declarative_base()
 
-class WorkRecord(Base):
+def team_column():
+    """所属团队列：新建数据默认取当前绑定的团队，已有表补加该列时存量数据归入默认团队"""
+    return Column(Integer, ForeignKey('teams.id'), nullable=False,
+                  default=tenancy.team_for_insert, server_default=text(str(tenancy.DEFAULT_TEAM_ID)))
+
+class ChangeTracked:
+    """变更跟踪列：插入和每次UPDATE（含批量UPDATE）时自动维护，增量备份按updated_at筛选变化的行"""
+    updated_at = Column(DateTime, default=datetime.now, onupdate=datetime.now)  # 最后修改时间
+    row_version = Column(Integer, nullable=False, default=1, server_default=text("1"),
+                         onupdate=literal_column("row_version + 1"))  # 修改次数
+
+class Team(ChangeTracked, Base):
+    """团队：工作记录、值班人员和值班安排按团队隔离"""
+    __tablename__ = 'teams'
+
+    id = Column(Integer, primary_key=True)
+    name = Column(String(50), nullable=False, unique=True)  # 团队名称
+
+@tenancy.scoped
+class WorkRecord(ChangeTracked, Base):
     __tablename__ = 'work_records'
     
     id = Column(Integer, primary_key=True)
@@ -15,24 +38,117 @@ class WorkRecord(Base):
     is_completed = Column(Integer, default=0)      # 是否完成(0未完成，1已完成)
     # 添加优先级字段 (1=低, 2=中, 3=高)
     priority = Column(Integer, default=2)          # 任务优先级
+    team_id = team_column()                        # 所属团队
+
+    # 按团队隔离后日常查询都带team_id等值条件，索引以team_id开头
+    __table_args__ = (
+        Index('ix_work_records_completed_end', 'is_completed', 'end_date'),  # 全部团队的归档扫描
+        Index('ix_work_records_team_pending', 'team_id', 'is_completed', 'priority', 'end_date'),  # 待办提醒
+        Index('ix_work_records_team_start_end', 'team_id', 'start_date', 'end_date'),  # 时间段重叠查询
+        Index('ix_work_records_team_recorder', 'team_id', 'recorder'),  # 按记录人精确筛选
+        Index('ix_work_records_team_work_type', 'team_id', 'work_type'),  # 按工作类型精确筛选
+        Index('ix_work_records_updated_at', 'updated_at'),  # 增量备份
+    )
+
+@tenancy.scoped
+class WorkRecordArchive(ChangeTracked, Base):
+    """已归档的工作记录，结构与work_records一致，保留原记录ID"""
+    __tablename__ = 'work_records_archive'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    recorder = Column(String(50), nullable=False)
+    work_type = Column(String(50), nullable=False)
+    work_content = Column(String(255), nullable=False)
+    start_date = Column(Date, nullable=False)
+    end_date = Column(Date, nullable=False)
+    is_completed = Column(Integer, default=1)
+    priority = Column(Integer, default=2)
+    archived_at = Column(DateTime, nullable=False)  # 归档时间
+    team_id = team_column()
+
+    __table_args__ = (
+        Index('ix_work_records_archive_team_start_end', 'team_id', 'start_date', 'end_date'),
+        Index('ix_work_records_archive_team_recorder', 'team_id', 'recorder'),
+        Index('ix_work_records_archive_team_work_type', 'team_id', 'work_type'),
+        Index('ix_work_records_archive_updated_at', 'updated_at'),
+    )
+
+@tenancy.scoped
+class WorkRecordDailyStat(Base):
+    """按天汇总的工作记录数量，由写入操作增量维护，供趋势图使用"""
+    __tablename__ = 'work_record_daily_stats'
 
-class DutyPersonnel(Base):
+    id = Column(Integer, primary_key=True)
+    day = Column(Date, nullable=False)                  # 记录开始日期
+    work_type = Column(String(50), nullable=False)
+    recorder = Column(String(50), nullable=False)
+    priority = Column(Integer, nullable=False)
+    is_completed = Column(Integer, nullable=False)
+    record_count = Column(Integer, nullable=False, default=0)
+    team_id = team_column()
+
+    __table_args__ = (
+        UniqueConstraint('team_id', 'day', 'work_type', 'recorder', 'priority', 'is_completed',
+                         name='uq_daily_stats_team_key'),
+    )
+
+@tenancy.scoped
+class DutyPersonnel(ChangeTracked, Base):
     __tablename__ = 'duty_personnel'
     
     id = Column(Integer, primary_key=True)
-    name = Column(String(50), nullable=False, unique=True)  # 值班人员姓名
+    name = Column(String(50), nullable=False)  # 值班人员姓名
+    team_id = team_column()
 
-class DailyDuty(Base):
+    __table_args__ = (
+        UniqueConstraint('team_id', 'name', name='uq_duty_personnel_team_name'),  # 姓名在团队内唯一
+    )
+
+@tenancy.scoped
+class DailyDuty(ChangeTracked, Base):
     __tablename__ = 'daily_duties'
     
     id = Column(Integer, primary_key=True)
-    date = Column(Date, nullable=False, unique=True)  # 日期
-    personnel = Column(String(50))  # 修改为存储单个值班人员姓名
+    date = Column(Date, nullable=False)  # 日期
+    # 当天值班人员，人员改名后无需修改；人员删除后置空，当天回到自动轮换
+    personnel_id = Column(Integer, ForeignKey('duty_personnel.id', ondelete='SET NULL'))
+    team_id = team_column()
+
+    __table_args__ = (
+        UniqueConstraint('team_id', 'date', name='uq_daily_duties_team_date'),  # 每个团队每天一条
+        Index('ix_daily_duties_personnel', 'personnel_id'),
+    )
 
-class User(Base):
+class User(ChangeTracked, Base):
     __tablename__ = 'users'
     
     id = Column(Integer, primary_key=True)
     username = Column(String(50), nullable=False, unique=True)  # 用户名
     password = Column(String(255), nullable=False)            # 密码（加密存储）
-    last_login = Column(Date)                                 # 上次登录时间
\ No newline at end of file
+    last_login = Column(Date)                                 # 上次登录时间
+    team_id = team_column()                                   # 所属团队，登录后据此限定数据范围
+
+    __table_args__ = (
+        Index('ix_users_team', 'team_id'),
+    )
+
+class DeletedRow(Base):
+    """删除行的墓碑，增量备份据此在恢复时删除对应的行"""
+    __tablename__ = 'deleted_rows'
+
+    id = Column(Integer, primary_key=True)
+    table_name = Column(String(64), nullable=False)  # 被删除行所在的表
+    row_id = Column(Integer, nullable=False)          # 被删除行的主键
+    deleted_at = Column(DateTime, nullable=False)
+
+    __table_args__ = (
+        Index('ix_deleted_rows_deleted_at', 'deleted_at'),
+    )
+
+class DataVersion(Base):
+    """各类数据的版本号，写入时递增，多个应用进程据此判断本地缓存是否失效"""
+    __tablename__ = 'data_versions'
+
+    entity = Column(String(50), primary_key=True)   # work_records / duty / users
+    version = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime)
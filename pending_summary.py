@@ -0,0 +1,85 @@
+import os
+import threading
+import time
+from collections import namedtuple
+from datetime import date, timedelta
+
+from sqlalchemy import select, func, case
+
+import db_utils
+import resilience
+import tenancy
+from models import WorkRecord
+
+# 每个优先级在提醒中展示的条数
+PENDING_TOP_N = int(os.environ.get("PENDING_TOP_N", "5"))
+# 截止日期在多少天内视为即将到期
+DUE_SOON_DAYS = int(os.environ.get("DUE_SOON_DAYS", "3"))
+# 即使数据版本未变化，摘要最多缓存的秒数（处理跨天等与写入无关的变化）
+PENDING_REFRESH_SECONDS = float(os.environ.get("PENDING_REFRESH_SECONDS", "60"))
+
+PendingItem = namedtuple("PendingItem", ["id", "recorder", "work_type", "work_content", "end_date", "priority"])
+
+_cache = {}  # 团队 -> {"key", "expires_at", "summary"}
+_lock = threading.Lock()
+
+def build_pending_summary(db, today=None, top_n=PENDING_TOP_N):
+    """查询待办摘要：一次聚合得到各类数量，每个优先级只取最紧急的top_n条"""
+    today = today or date.today()
+    due_soon_end = today + timedelta(days=DUE_SOON_DAYS)
+
+    counts = db.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(case((WorkRecord.end_date < today, 1), else_=0)), 0),
+            func.coalesce(func.sum(case((WorkRecord.end_date.between(today, due_soon_end), 1), else_=0)), 0),
+            func.coalesce(func.sum(case((WorkRecord.priority == 3, 1), else_=0)), 0),
+        ).where(WorkRecord.is_completed == 0)
+    ).one()
+
+    top_by_priority = {}
+    for priority in (3, 2, 1):
+        rows = db.execute(
+            select(WorkRecord.id, WorkRecord.recorder, WorkRecord.work_type, WorkRecord.work_content,
+                   WorkRecord.end_date, WorkRecord.priority)
+            .where(WorkRecord.is_completed == 0, WorkRecord.priority == priority)
+            .order_by(WorkRecord.end_date.asc(), WorkRecord.id.asc())
+            .limit(top_n)
+        ).all()
+        top_by_priority[priority] = tuple(PendingItem(*row) for row in rows)
+
+    return {
+        "date": today,
+        "total": int(counts[0]),
+        "overdue": int(counts[1]),
+        "due_soon": int(counts[2]),
+        "high_priority": int(counts[3]),
+        "top_by_priority": top_by_priority,
+    }
+
+def get_pending_summary():
+    """返回当前团队在进程内共享的待办摘要，数据版本变化或超过刷新间隔时重新查询
+
+    数据库不可用时返回最近一次成功生成的摘要
+    """
+    team_id = tenancy.current_team()
+    key = (db_utils.get_data_version(), date.today())
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(team_id)
+        if entry and entry["key"] == key and now < entry["expires_at"]:
+            return entry["summary"]
+
+    summary, stale_at = resilience.last_known_good(f"pending_summary:{team_id}", _load_summary)
+    if stale_at is None:
+        with _lock:
+            _cache[team_id] = {"key": key, "expires_at": now + PENDING_REFRESH_SECONDS, "summary": summary}
+    return summary
+
+@resilience.resilient_read
+def _load_summary():
+    db = next(db_utils.get_read_session(prefer_primary=True))
+    try:
+        return build_pending_summary(db)
+    finally:
+        db.close()
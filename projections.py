@@ -0,0 +1,270 @@
+import math
+import os
+from datetime import date, datetime, timedelta
+from typing import NamedTuple
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+from sqlalchemy import Date, DateTime, Integer, String, and_, func, select, type_coerce
+from sqlalchemy.types import NullType
+
+import resilience
+from models import DailyDuty, DutyPersonnel, Team, User, WorkRecord, WorkRecordArchive
+
+# 每次从游标读取的行数，大结果集分块转换为列，避免一次性生成全部Python行对象
+FRAME_CHUNK_SIZE = int(os.environ.get("FRAME_CHUNK_SIZE", "20000"))
+
+# 只读列表使用的轻量行对象：不进入Session的identity map，也不做变更跟踪
+
+class RecordRow(NamedTuple):
+    id: int
+    recorder: str
+    work_type: str
+    work_content: str
+    start_date: date
+    end_date: date
+    is_completed: int
+    priority: int
+
+class ArchivedRecordRow(NamedTuple):
+    id: int
+    recorder: str
+    work_type: str
+    work_content: str
+    start_date: date
+    end_date: date
+    is_completed: int
+    priority: int
+    archived_at: datetime
+
+class IntervalRow(NamedTuple):
+    recorder: str
+    start_date: date
+    end_date: date
+
+class DutyRow(NamedTuple):
+    id: int
+    name: str
+    assigned: bool  # 是否为当天已保存的值班人员
+
+PRIORITY_LABELS = {1: "低", 2: "中", 3: "高"}
+COMPLETED_LABELS = {0: "否", 1: "是"}
+# 表格和导出使用的中文列名
+COLUMN_LABELS = {
+    "id": "ID",
+    "recorder": "记录人",
+    "work_type": "工作类型",
+    "work_content": "工作内容",
+    "start_date": "开始日期",
+    "end_date": "结束日期",
+    "is_completed": "是否完成",
+    "priority": "优先级",
+    "archived_at": "归档时间",
+    "username": "用户名",
+    "team": "团队",
+    "last_login": "上次登录",
+}
+
+# 查询一律通过模型属性构造，ORM语句才会被自动附加当前团队的条件（见tenancy）
+def _columns(model, row_type):
+    return [getattr(model, name) for name in row_type._fields]
+
+@resilience.resilient_read
+def fetch_rows(db, stmt, row_type=RecordRow):
+    """执行查询并把结果转换为不可变的行对象"""
+    return list(map(row_type._make, db.execute(stmt).tuples()))
+
+def record_select(model=WorkRecord, row_type=RecordRow):
+    """只选择行对象需要的列"""
+    return select(*_columns(model, row_type))
+
+def record_models(include_archive=False):
+    return [WorkRecord, WorkRecordArchive] if include_archive else [WorkRecord]
+
+def _search_filters(model, priority=None, is_completed=None, recorder=None, work_type=None, exact=False):
+    """exact为True时记录人、工作类型按等值匹配，可使用(team_id, recorder)等索引；否则按包含匹配"""
+    filters = []
+    if priority is not None:
+        filters.append(model.priority == priority)
+    if is_completed is not None:
+        filters.append(model.is_completed == is_completed)
+    if recorder:
+        filters.append(model.recorder == recorder if exact else model.recorder.like(f"%{recorder}%"))
+    if work_type:
+        filters.append(model.work_type == work_type if exact else model.work_type.like(f"%{work_type}%"))
+    return filters
+
+def _list_select(skip=0, limit=100):
+    return record_select().order_by(WorkRecord.id).offset(skip).limit(limit)
+
+def _search_select(model=WorkRecord, row_type=RecordRow, **filters):
+    return record_select(model, row_type).where(*_search_filters(model, **filters))
+
+def _date_range_selects(start_date, end_date, include_archive=False):
+    return [record_select(model).where(model.start_date >= start_date, model.end_date <= end_date)
+            for model in record_models(include_archive)]
+
+def record_page_rows(db, after_id=None, limit=100, **filters):
+    """按主键游标分页，多取一条用于判断是否还有下一页"""
+    query = _search_select(**filters)
+    if after_id is not None:
+        query = query.where(WorkRecord.id > after_id)
+    return fetch_rows(db, query.order_by(WorkRecord.id).limit(limit + 1))
+
+def distinct_value_rows(db, field):
+    """未归档记录中某字段（recorder、work_type）的全部取值及记录数，按记录数从多到少排列
+
+    与筛选后的查询范围一致：筛选只查询未归档记录，计数也不含归档记录；
+    按团队分组可以只扫描(team_id, recorder)、(team_id, work_type)索引
+    """
+    column = getattr(WorkRecord, field)
+    count = func.count()
+    query = select(column, count).where(column.is_not(None), column != "").group_by(column)
+    return [(value, int(total)) for value, total in db.execute(query.order_by(count.desc(), column))]
+
+# ---- 值班 ----
+
+def duty_roster_select(day):
+    """值班名单（按ID排序，即轮换顺序）及当天已保存的值班人员，一次外连接查询得到"""
+    return select(DutyPersonnel.id, DutyPersonnel.name, DailyDuty.id.is_not(None)).outerjoin(
+        DailyDuty, and_(DailyDuty.personnel_id == DutyPersonnel.id, DailyDuty.date == day)
+    ).order_by(DutyPersonnel.id)
+
+def duty_assignment_select(start_date, end_date):
+    """时间段内已保存的值班安排，连接人员表取姓名"""
+    return select(DailyDuty.date, DutyPersonnel.id, DutyPersonnel.name).join(
+        DutyPersonnel, DutyPersonnel.id == DailyDuty.personnel_id
+    ).where(DailyDuty.date.between(start_date, end_date))
+
+# ---- 时间段重叠查询 ----
+
+def _span_days(model, dialect_name):
+    if dialect_name == "sqlite":
+        return func.julianday(model.end_date) - func.julianday(model.start_date)
+    return func.datediff(model.end_date, model.start_date)
+
+@resilience.resilient_read
+def max_span_days(db, include_archive=False):
+    """最长一条记录跨越的天数"""
+    dialect_name = db.get_bind().dialect.name
+    spans = [db.scalar(select(func.max(_span_days(model, dialect_name)))) for model in record_models(include_archive)]
+    return max([math.ceil(span) for span in spans if span is not None] + [0])
+
+def _overlap_selects(start_date, end_date, max_span, include_archive=False, is_completed=None, row_type=RecordRow):
+    """与[start_date, end_date]有交集的记录：start_date <= 查询结束 且 end_date >= 查询开始
+
+    已知最长跨度时，开始日期必然不早于 查询开始 - 最长跨度，
+    因此条件可以改写为start_date上的有界范围扫描，走(team_id, start_date, end_date)索引
+    """
+    selects = []
+    for model in record_models(include_archive):
+        query = record_select(model, row_type).where(
+            model.start_date.between(start_date - timedelta(days=max_span), end_date),
+            model.end_date >= start_date
+        )
+        if is_completed is not None:
+            query = query.where(model.is_completed == is_completed)
+        if "id" in row_type._fields:
+            query = query.order_by(model.start_date, model.id)
+        selects.append(query)
+    return selects
+
+def overlapping_record_frame(db, start_date, end_date, max_span, include_archive=False, is_completed=None, limit=None,
+                             row_type=RecordRow):
+    frames = [read_frame(db, stmt if limit is None else stmt.limit(limit))
+              for stmt in _overlap_selects(start_date, end_date, max_span, include_archive, is_completed, row_type)]
+    non_empty = [frame for frame in frames if not frame.empty]
+    if len(non_empty) <= 1:
+        return (non_empty or frames)[0]
+    frame = pd.concat(non_empty, ignore_index=True)
+    if "id" in row_type._fields:
+        frame = frame.sort_values(["start_date", "id"], ignore_index=True)
+    return frame if limit is None else frame.head(limit)
+
+# ---- 列式DataFrame：查询结果直接读成pyarrow列，供表格展示和导出使用 ----
+
+def _arrow_type(sql_type):
+    """SQL列类型对应的Arrow类型，未知类型返回None由pyarrow自行推断"""
+    if isinstance(sql_type, DateTime):
+        return pa.timestamp("us")
+    if isinstance(sql_type, Date):
+        return pa.date32()
+    if isinstance(sql_type, Integer):
+        return pa.int64()
+    if isinstance(sql_type, String):
+        return pa.string()
+    return None
+
+def _arrow_array(values, arrow_type):
+    array = pa.array(values)
+    if arrow_type is not None and array.type != arrow_type:
+        # SQLite把日期存为文本，在Arrow中整列转换
+        array = pc.cast(array, arrow_type)
+    return array
+
+@resilience.resilient_read
+def read_frame(db, stmt, chunksize=FRAME_CHUNK_SIZE):
+    """按块从游标读取查询结果，逐列转换为Arrow数组后生成pyarrow类型的DataFrame
+
+    日期列跳过SQLAlchemy的逐行类型转换，读取驱动原始值后在Arrow中整列转换
+    """
+    columns = list(stmt.selected_columns)
+    types = [_arrow_type(column.type) for column in columns]
+    raw = stmt.with_only_columns(*[
+        type_coerce(column, NullType()).label(column.name) if isinstance(column.type, (Date, DateTime)) else column
+        for column in columns
+    ])
+    names = [column.name for column in columns]
+    result = db.execute(raw)
+    batches = [
+        pa.RecordBatch.from_arrays([_arrow_array(values, arrow_type)
+                                    for values, arrow_type in zip(zip(*rows), types)], names=names)
+        for rows in result.partitions(chunksize)
+    ]
+    if not batches:
+        return pd.DataFrame(columns=names)
+    return pa.Table.from_batches(batches).to_pandas(types_mapper=pd.ArrowDtype)
+
+def label_column(values, labels, default):
+    """把整数编码列按labels映射为分类列，未知值映射为default，整列一次完成不逐行调用Python"""
+    categories = list(dict.fromkeys([*labels.values(), default]))
+    values = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+    codes = np.full(len(values), categories.index(default), dtype="int8")
+    for value, label in labels.items():
+        codes[values == value] = categories.index(label)
+    return pd.Categorical.from_codes(codes, categories=categories)
+
+def display_frame(df, priority_default="未知", completed_labels=COMPLETED_LABELS):
+    """把记录DataFrame转换为中文列名和标签；completed_labels为None时保留布尔列"""
+    df = df.copy()
+    if "priority" in df:
+        df["priority"] = label_column(df["priority"], PRIORITY_LABELS, priority_default)
+    if "is_completed" in df:
+        if completed_labels is None:
+            df["is_completed"] = df["is_completed"].fillna(0).astype("bool")
+        else:
+            df["is_completed"] = label_column(df["is_completed"], completed_labels, "未知")
+    return df.rename(columns=COLUMN_LABELS)
+
+def list_record_frame(db, skip=0, limit=100):
+    return read_frame(db, _list_select(skip, limit))
+
+def search_record_frame(db, priority=None, is_completed=None, recorder=None, work_type=None, exact=False):
+    return read_frame(db, _search_select(priority=priority, is_completed=is_completed,
+                                         recorder=recorder, work_type=work_type, exact=exact))
+
+def search_archived_record_frame(db, priority=None, is_completed=None, recorder=None, work_type=None, exact=False):
+    return read_frame(db, _search_select(WorkRecordArchive, ArchivedRecordRow, priority=priority,
+                                         is_completed=is_completed, recorder=recorder, work_type=work_type,
+                                         exact=exact))
+
+def record_frame_by_date_range(db, start_date, end_date, include_archive=False):
+    frames = [read_frame(db, stmt) for stmt in _date_range_selects(start_date, end_date, include_archive)]
+    non_empty = [frame for frame in frames if not frame.empty]
+    return pd.concat(non_empty, ignore_index=True) if len(non_empty) > 1 else (non_empty or frames)[0]
+
+def user_frame(db):
+    return read_frame(db, select(User.id, User.username, Team.name.label("team"), User.last_login)
+                      .outerjoin(Team, Team.id == User.team_id).order_by(User.id))
@@ -0,0 +1,270 @@
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from datetime import date, datetime, timedelta
+from io import BytesIO
+
+import pandas as pd
+from sqlalchemy import select, func, case, union_all
+
+import db_utils
+import projections
+import tenancy
+
+logger = logging.getLogger(__name__)
+
+# 预生成报表的存放目录
+REPORT_DIR = os.environ.get("REPORT_DIR", "reports")
+# 快照保留天数，超过后由调度器删除
+REPORT_RETENTION_DAYS = int(os.environ.get("REPORT_RETENTION_DAYS", "30"))
+# 调度器检查间隔(秒)，0为不启动调度器
+REPORT_INTERVAL_SECONDS = float(os.environ.get("REPORT_INTERVAL_SECONDS", "3600"))
+# 需要预生成的标准报表，取值见REPORT_PERIODS
+STANDARD_REPORTS = [name.strip() for name in os.environ.get("STANDARD_REPORTS", "last_30_days,last_month").split(",")
+                    if name.strip()]
+# 附带汇总透视表的字段，取值为recorder、work_type，留空则只导出明细
+REPORT_PIVOTS = [field.strip() for field in os.environ.get("REPORT_PIVOTS", "recorder,work_type").split(",")
+                 if field.strip()]
+
+def _last_month(today):
+    end = today.replace(day=1) - timedelta(days=1)
+    return end.replace(day=1), end
+
+REPORT_PERIODS = {
+    "last_7_days": ("最近7天", lambda today: (today - timedelta(days=7), today)),
+    "last_30_days": ("最近30天", lambda today: (today - timedelta(days=30), today)),
+    "this_month": ("本月", lambda today: (today.replace(day=1), today)),
+    "last_month": ("上月", _last_month),
+}
+PIVOT_SHEETS = {"recorder": "按记录人汇总", "work_type": "按工作类型汇总"}
+DETAIL_SHEET = "工作记录"
+
+_stop = threading.Event()
+_scheduler = {"thread": None}
+_lock = threading.Lock()
+
+# ---- 报表内容 ----
+
+def pivot_summary(db, field, start_date, end_date, include_archive=False):
+    """在数据库中按字段分组汇总完成情况和优先级分布"""
+    source = union_all(*[
+        select(getattr(model, field).label("value"), model.is_completed, model.priority)
+        .where(model.start_date >= start_date, model.end_date <= end_date)
+        for model in projections.record_models(include_archive)
+    ]).subquery()
+    stmt = select(
+        source.c.value.label(projections.COLUMN_LABELS[field]),
+        func.count().label("记录数"),
+        func.sum(case((source.c.is_completed == 1, 1), else_=0)).label("已完成"),
+        func.sum(case((source.c.is_completed == 0, 1), else_=0)).label("未完成"),
+        func.sum(case((source.c.priority == 3, 1), else_=0)).label("高优先级"),
+        func.sum(case((source.c.priority == 2, 1), else_=0)).label("中优先级"),
+        func.sum(case((source.c.priority == 1, 1), else_=0)).label("低优先级"),
+    ).group_by(source.c.value).order_by(func.count().desc(), source.c.value)
+    return projections.read_frame(db, stmt)
+
+def write_workbook(sheets):
+    """把 {工作表名: DataFrame} 写成带统一表头样式的xlsx，返回字节内容"""
+    from openpyxl.styles import Font, PatternFill, Alignment
+    from openpyxl.utils import get_column_letter
+
+    header_font = Font(bold=True, color='FFFFFF')
+    header_fill = PatternFill(start_color='4F81BD', end_color='4F81BD', fill_type='solid')
+    alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
+
+    output = BytesIO()
+    with pd.ExcelWriter(output, engine='openpyxl') as writer:
+        for sheet_name, df in sheets.items():
+            df.to_excel(writer, index=False, sheet_name=sheet_name)
+            worksheet = writer.sheets[sheet_name]
+
+            for cell in worksheet[1]:
+                cell.font = header_font
+                cell.fill = header_fill
+                cell.alignment = alignment
+
+            # 列宽按整列最长内容计算，不逐个单元格读取
+            for index, column in enumerate(df.columns, start=1):
+                lengths = df[column].astype(str).str.len()
+                max_length = max(len(str(column)), int(lengths.max()) if len(lengths) else 0)
+                worksheet.column_dimensions[get_column_letter(index)].width = min(max_length + 2, 50)
+
+            worksheet.freeze_panes = 'A2'
+    return output.getvalue()
+
+def build_report(db, start_date, end_date, pivots=REPORT_PIVOTS, include_archive=False):
+    """生成明细表和各透视汇总表组成的工作簿，没有记录时返回None"""
+    detail = db_utils.export_to_excel(db, start_date, end_date, include_archive=include_archive)
+    if detail.empty:
+        return None
+    sheets = {DETAIL_SHEET: detail}
+    for field in pivots:
+        sheets[PIVOT_SHEETS[field]] = pivot_summary(db, field, start_date, end_date, include_archive)
+    return write_workbook(sheets)
+
+# ---- 报表存储 ----
+
+def period_range(name, today=None):
+    label, compute = REPORT_PERIODS[name]
+    start_date, end_date = compute(today or date.today())
+    return label, start_date, end_date
+
+def _snapshot_path(team_id, name, start_date, end_date, suffix, report_dir=REPORT_DIR):
+    return os.path.join(report_dir, f"team{team_id}_{name}_{start_date:%Y%m%d}_{end_date:%Y%m%d}{suffix}")
+
+def _write_atomic(path, content, mode="wb"):
+    """先写临时文件再替换，其他进程不会读到写了一半的文件"""
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, mode) as file:
+        file.write(content)
+    os.replace(temp_path, path)
+
+def generate_snapshot(db, name, today=None, report_dir=REPORT_DIR, force=False):
+    """为当前绑定的团队生成一份标准报表快照；快照已存在且数据版本未变化时跳过，返回是否重新生成"""
+    team_id = tenancy.team_for_insert()
+    label, start_date, end_date = period_range(name, today)
+    meta_path = _snapshot_path(team_id, name, start_date, end_date, ".json", report_dir)
+    version = db_utils.get_data_version()
+    if not force and os.path.exists(meta_path):
+        with open(meta_path, encoding="utf-8") as file:
+            if json.load(file).get("data_version") == version:
+                return False
+
+    content = build_report(db, start_date, end_date)
+    os.makedirs(report_dir, exist_ok=True)
+    xlsx_path = _snapshot_path(team_id, name, start_date, end_date, ".xlsx", report_dir)
+    if content is not None:
+        _write_atomic(xlsx_path, content)
+    elif os.path.exists(xlsx_path):
+        os.remove(xlsx_path)
+    meta = {
+        "team_id": team_id,
+        "name": name,
+        "label": label,
+        "start_date": start_date.isoformat(),
+        "end_date": end_date.isoformat(),
+        "generated_at": datetime.now().isoformat(timespec="seconds"),
+        "data_version": version,
+        "pivots": REPORT_PIVOTS,
+        "empty": content is None,
+        "file": os.path.basename(xlsx_path) if content is not None else None,
+    }
+    _write_atomic(meta_path, json.dumps(meta, ensure_ascii=False), mode="w")
+    return True
+
+def generate_standard_reports(db=None, today=None, report_dir=REPORT_DIR, force=False):
+    """为每个团队生成所有配置的标准报表，返回重新生成的 (团队ID, 报表名) 列表"""
+    own_session = db is None
+    db = db or next(db_utils.get_read_session(prefer_primary=True))
+    try:
+        generated = []
+        for team in db_utils.get_all_teams(db):
+            with tenancy.team_scope(team.id):
+                generated += [(team.id, name) for name in STANDARD_REPORTS
+                              if generate_snapshot(db, name, today=today, report_dir=report_dir, force=force)]
+        return generated
+    finally:
+        if own_session:
+            db.close()
+
+def list_snapshots(report_dir=REPORT_DIR, team_id=None):
+    """返回快照的元数据，按生成时间从新到旧排列；指定team_id时只返回该团队的快照"""
+    if not os.path.isdir(report_dir):
+        return []
+    snapshots = []
+    for filename in os.listdir(report_dir):
+        if not filename.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(report_dir, filename), encoding="utf-8") as file:
+                meta = json.load(file)
+        except (OSError, ValueError):
+            continue
+        if team_id is not None and meta.get("team_id") != team_id:
+            continue
+        meta["meta_path"] = os.path.join(report_dir, filename)
+        meta["path"] = os.path.join(report_dir, meta["file"]) if meta.get("file") else None
+        snapshots.append(meta)
+    return sorted(snapshots, key=lambda meta: meta["generated_at"], reverse=True)
+
+def current_snapshots(today=None, report_dir=REPORT_DIR, team_id=None):
+    """当前团队各标准报表周期对应的快照，按STANDARD_REPORTS顺序排列"""
+    snapshots = {}
+    for meta in list_snapshots(report_dir, team_id or tenancy.team_for_insert()):
+        snapshots.setdefault((meta["name"], meta["start_date"], meta["end_date"]), meta)
+    current = []
+    for name in STANDARD_REPORTS:
+        _, start_date, end_date = period_range(name, today)
+        meta = snapshots.get((name, start_date.isoformat(), end_date.isoformat()))
+        if meta:
+            current.append(meta)
+    return current
+
+def prune_snapshots(retention_days=REPORT_RETENTION_DAYS, report_dir=REPORT_DIR):
+    """删除生成时间早于保留天数的快照，返回删除的快照数"""
+    cutoff = (datetime.now() - timedelta(days=retention_days)).isoformat(timespec="seconds")
+    removed = 0
+    for meta in list_snapshots(report_dir):
+        if meta["generated_at"] >= cutoff:
+            continue
+        for path in (meta["path"], meta["meta_path"]):
+            if path and os.path.exists(path):
+                os.remove(path)
+        removed += 1
+    return removed
+
+# ---- 调度器 ----
+
+def _run_scheduler(interval):
+    while not _stop.is_set():
+        try:
+            generate_standard_reports()
+            prune_snapshots()
+        except Exception:
+            logger.exception("生成预置报表失败")
+        _stop.wait(interval)
+
+def start_scheduler(interval=REPORT_INTERVAL_SECONDS):
+    """启动后台报表调度线程，每个进程只启动一次；interval<=0时不启动"""
+    if interval <= 0:
+        return None
+    with _lock:
+        thread = _scheduler["thread"]
+        if thread is None or not thread.is_alive():
+            _stop.clear()
+            thread = threading.Thread(target=_run_scheduler, args=(interval,), name="report-scheduler", daemon=True)
+            thread.start()
+            _scheduler["thread"] = thread
+    return thread
+
+def stop_scheduler():
+    _stop.set()
+
+def main():
+    parser = argparse.ArgumentParser(description="生成、查看或清理预置报表快照")
+    parser.add_argument("command", choices=["generate", "list", "prune", "run"])
+    parser.add_argument("--force", action="store_true", help="忽略数据版本，重新生成所有标准报表")
+    args = parser.parse_args()
+
+    db_utils.init_db()
+    if args.command == "generate":
+        print(f"已生成: {generate_standard_reports(force=args.force)}")
+    elif args.command == "list":
+        for meta in list_snapshots():
+            print(f"{meta['generated_at']}  团队{meta.get('team_id', '-')}  {meta['label']:<8} "
+                  f"{meta['start_date']} ~ {meta['end_date']}  "
+                  f"{meta['file'] or '（无记录）'}")
+    elif args.command == "prune":
+        print(f"已删除 {prune_snapshots()} 份快照")
+    else:
+        # 前台运行调度器，可替代应用进程内的调度线程
+        logging.basicConfig(level=logging.INFO)
+        start_scheduler(REPORT_INTERVAL_SECONDS or 3600)
+        while True:
+            time.sleep(60)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,270 @@
+import argparse
+import contextvars
+import functools
+import os
+import random
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError, DisconnectionError, OperationalError, TimeoutError as PoolTimeoutError
+from sqlalchemy.orm import Session
+from tenacity import (AsyncRetrying, Retrying, retry_if_exception, stop_after_attempt,
+                      wait_random_exponential)
+
+# 只读查询遇到瞬时错误时的最大尝试次数（含第一次）
+DB_RETRY_ATTEMPTS = int(os.environ.get("DB_RETRY_ATTEMPTS", "3"))
+# 重试等待的上限秒数，实际等待为带随机抖动的指数退避
+DB_RETRY_MAX_WAIT = float(os.environ.get("DB_RETRY_MAX_WAIT", "2"))
+# 连续多少次瞬时错误后熔断
+CIRCUIT_FAILURE_THRESHOLD = int(os.environ.get("CIRCUIT_FAILURE_THRESHOLD", "5"))
+# 熔断后多少秒放行一次试探请求
+CIRCUIT_RESET_SECONDS = float(os.environ.get("CIRCUIT_RESET_SECONDS", "30"))
+# 故障注入：每条SQL按该概率模拟连接中断，仅用于本地测试
+DB_FAULT_RATE = float(os.environ.get("DB_FAULT_RATE", "0"))
+
+# MySQL中可以通过重连或重试恢复的错误码
+TRANSIENT_MYSQL_CODES = {
+    1040,  # Too many connections
+    1205,  # Lock wait timeout exceeded
+    1213,  # Deadlock found
+    2002,  # Can't connect through socket
+    2003,  # Can't connect to MySQL server
+    2006,  # MySQL server has gone away
+    2013,  # Lost connection during query
+    2055,  # Lost connection (system error)
+}
+TRANSIENT_SQLITE_MESSAGES = ("database is locked", "database is busy", "disk i/o error")
+
+class CircuitOpenError(RuntimeError):
+    """熔断期间直接失败，不再访问数据库"""
+
+def is_transient(exc):
+    """判断异常是否为可重试的瞬时错误（断连、连接池超时、死锁、锁等待等）"""
+    if isinstance(exc, (DisconnectionError, PoolTimeoutError)):
+        return True
+    if isinstance(exc, DBAPIError):
+        if exc.connection_invalidated:
+            return True
+        orig = exc.orig
+        code = orig.args[0] if orig is not None and orig.args else None
+        if isinstance(code, int) and code in TRANSIENT_MYSQL_CODES:
+            return True
+        if isinstance(exc, OperationalError):
+            message = str(orig).lower()
+            return any(text in message for text in TRANSIENT_SQLITE_MESSAGES)
+    return False
+
+class CircuitBreaker:
+    """连续失败达到阈值后进入open状态，reset_seconds后放行一个试探请求(half_open)，成功则恢复"""
+
+    def __init__(self, failure_threshold=CIRCUIT_FAILURE_THRESHOLD, reset_seconds=CIRCUIT_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.failures = 0
+        self.opened_at = None
+        self._probing = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state(time.monotonic())
+
+    def _state(self, now):
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if now - self.opened_at >= self.reset_seconds else "open"
+
+    def before_call(self):
+        with self._lock:
+            state = self._state(time.monotonic())
+            if state == "open" or (state == "half_open" and self._probing):
+                raise CircuitOpenError("数据库暂时不可用，请稍后重试")
+            if state == "half_open":
+                self._probing = True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._probing or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+            self._probing = False
+
+    def release_probe(self):
+        """试探请求因非数据库错误结束时，允许下一个请求继续试探"""
+        with self._lock:
+            self._probing = False
+
+breaker = CircuitBreaker()
+# 已在受保护的调用内部时，嵌套调用不再单独重试，避免重试次数相乘
+_active = contextvars.ContextVar("resilience_active", default=False)
+
+def _call(fn, args, kwargs):
+    breaker.before_call()
+    token = _active.set(True)
+    try:
+        result = fn(*args, **kwargs)
+    except Exception as exc:
+        if is_transient(exc):
+            breaker.record_failure()
+            _rollback(args)
+        else:
+            breaker.release_probe()
+        raise
+    finally:
+        _active.reset(token)
+    breaker.record_success()
+    return result
+
+def _rollback(args):
+    """失败的连接已被标记失效，回滚后会话可以在下一次尝试中取新连接"""
+    if args and isinstance(args[0], Session):
+        args[0].rollback()
+
+def _can_retry(args):
+    # 会话中已有未提交的写入时不能重试，回滚会丢掉这些写入
+    return not (args and isinstance(args[0], Session) and args[0].info.get("has_writes"))
+
+def _retry_options(attempts):
+    return {
+        "stop": stop_after_attempt(attempts),
+        "wait": wait_random_exponential(multiplier=0.1, max=DB_RETRY_MAX_WAIT),
+        "retry": retry_if_exception(is_transient),
+        "reraise": True,
+    }
+
+def resilient_read(fn=None, attempts=None):
+    """只读查询：瞬时错误时带抖动退避重试，并受熔断器保护"""
+    if fn is None:
+        return functools.partial(resilient_read, attempts=attempts)
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _active.get():
+            return fn(*args, **kwargs)
+        if not _can_retry(args):
+            return _call(fn, args, kwargs)
+        for attempt in Retrying(**_retry_options(attempts or DB_RETRY_ATTEMPTS)):
+            with attempt:
+                return _call(fn, args, kwargs)
+    return wrapper
+
+def resilient_read_async(fn):
+    """异步只读查询的重试和熔断保护"""
+    @functools.wraps(fn)
+    async def wrapper(*args, **kwargs):
+        async for attempt in AsyncRetrying(**_retry_options(DB_RETRY_ATTEMPTS)):
+            with attempt:
+                breaker.before_call()
+                try:
+                    result = await fn(*args, **kwargs)
+                except Exception as exc:
+                    if is_transient(exc):
+                        breaker.record_failure()
+                    else:
+                        breaker.release_probe()
+                    raise
+                breaker.record_success()
+                return result
+    return wrapper
+
+def guarded_write(fn):
+    """写操作：只做熔断保护不自动重试，避免提交结果未知时重复写入"""
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if _active.get():
+            return fn(*args, **kwargs)
+        return _call(fn, args, kwargs)
+    return wrapper
+
+# ---- 只读组件的最近一次成功数据 ----
+
+_last_good = {}
+_last_good_lock = threading.Lock()
+
+def last_known_good(name, loader):
+    """执行loader并保存结果；数据库不可用时返回上一次成功的结果
+
+    返回 (数据, 数据获取时间)，获取时间为None表示本次实时读取成功；没有可用的旧数据时抛出原异常
+    """
+    try:
+        value = loader()
+    except Exception as exc:
+        if not (isinstance(exc, CircuitOpenError) or is_transient(exc)):
+            raise
+        with _last_good_lock:
+            cached = _last_good.get(name)
+        if cached is None:
+            raise
+        return cached["value"], cached["fetched_at"]
+    with _last_good_lock:
+        _last_good[name] = {"value": value, "fetched_at": datetime.now()}
+    return value, None
+
+# ---- 故障注入 ----
+
+class FaultInjector:
+    """在执行SQL前按概率抛出模拟的断连错误，down为True时模拟数据库完全不可用"""
+
+    def __init__(self, rate=DB_FAULT_RATE):
+        self.rate = rate
+        self.down = False
+        self.injected = 0
+
+    @property
+    def enabled(self):
+        return self.rate > 0 or self.down
+
+    def install(self, engine):
+        event.listen(engine, "before_cursor_execute", self._before_cursor_execute)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        if self.down or (self.rate > 0 and random.random() < self.rate):
+            self.injected += 1
+            raise OperationalError(statement, parameters, _SimulatedDisconnect(2013, "Lost connection (模拟故障)"))
+
+class _SimulatedDisconnect(Exception):
+    pass
+
+fault_injector = FaultInjector()
+
+def main():
+    parser = argparse.ArgumentParser(description="用故障注入验证重试、熔断和降级行为")
+    parser.add_argument("--rate", type=float, default=0.3, help="每条SQL模拟断连的概率")
+    parser.add_argument("--calls", type=int, default=40)
+    parser.add_argument("--outage", type=int, default=10, help="第几次调用起模拟数据库完全不可用")
+    parser.add_argument("--recover", type=int, default=25, help="第几次调用起恢复")
+    args = parser.parse_args()
+
+    # 以脚本运行时本模块是__main__，需使用db_utils导入的同一个模块实例
+    import db_utils
+    import resilience
+    db_utils.init_db()
+    injector = resilience.fault_injector
+    injector.install(db_utils.engine)
+    injector.rate = args.rate
+
+    for call in range(args.calls):
+        injector.down = args.outage <= call < args.recover
+        db = next(db_utils.get_read_session(prefer_primary=True))
+        try:
+            value, stale_at = resilience.last_known_good("duty", lambda: db_utils.get_all_duty_personnel(db))
+            result = f"旧数据({stale_at:%H:%M:%S})" if stale_at else "成功"
+        except Exception as exc:
+            result = f"失败: {type(exc).__name__}"
+        finally:
+            db.close()
+        print(f"{call:3d} 故障={'宕机' if injector.down else '抖动'} 熔断器={resilience.breaker.state:<9} {result}")
+        time.sleep(0.2)
+    print(f"共注入 {injector.injected} 次故障")
+
+if __name__ == "__main__":
+    main()
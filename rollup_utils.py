@@ -0,0 +1,168 @@
+import argparse
+from collections import Counter
+
+import pandas as pd
+from sqlalchemy import select, insert, update, delete, func, union_all
+from sqlalchemy.exc import IntegrityError
+
+import data_versions
+import tenancy
+from models import WorkRecord, WorkRecordArchive, WorkRecordDailyStat
+
+# 汇总维度：记录字段 -> 汇总表字段，团队在前与唯一约束的列顺序一致
+ROLLUP_FIELDS = {
+    "team_id": "team_id",
+    "start_date": "day",
+    "work_type": "work_type",
+    "recorder": "recorder",
+    "priority": "priority",
+    "is_completed": "is_completed",
+}
+
+# 趋势图粒度 -> pandas重采样规则
+GRANULARITY_RULES = {"day": "D", "week": "W-MON", "month": "MS"}
+
+def rollup_key(values):
+    """由记录对象或字段字典生成汇总键，空值按模型默认值处理"""
+    get = values.get if isinstance(values, dict) else lambda name: getattr(values, name)
+    priority = get("priority")
+    team_id = get("team_id")
+    return (
+        tenancy.team_for_insert() if team_id is None else team_id,
+        get("start_date"),
+        get("work_type"),
+        get("recorder"),
+        2 if priority is None else int(priority),
+        1 if get("is_completed") else 0,
+    )
+
+def rollup_values(record):
+    """取出记录当前的汇总维度字段，用于修改前保存原值"""
+    return {field: getattr(record, field) for field in ROLLUP_FIELDS}
+
+def apply_rollup_deltas(db, deltas):
+    """在当前事务中累加汇总计数，调用方负责提交
+
+    deltas: {rollup_key: 增量}，增量可为负数
+    """
+    for key, delta in deltas.items():
+        if not delta:
+            continue
+        criteria = [getattr(WorkRecordDailyStat, field) == value
+                    for field, value in zip(ROLLUP_FIELDS.values(), key)]
+        result = db.execute(
+            update(WorkRecordDailyStat)
+            .where(*criteria)
+            .values(record_count=WorkRecordDailyStat.record_count + delta)
+            .execution_options(synchronize_session=False)
+        )
+        if result.rowcount:
+            continue
+        try:
+            # 其他进程可能同时插入同一个键，冲突时回退到累加
+            with db.begin_nested():
+                db.execute(insert(WorkRecordDailyStat).values(
+                    **dict(zip(ROLLUP_FIELDS.values(), key)), record_count=delta
+                ))
+        except IntegrityError:
+            db.execute(
+                update(WorkRecordDailyStat)
+                .where(*criteria)
+                .values(record_count=WorkRecordDailyStat.record_count + delta)
+                .execution_options(synchronize_session=False)
+            )
+
+def record_change_deltas(before=None, after=None):
+    """计算一条记录从before变为after时的汇总增量，before/after为None表示新增/删除"""
+    deltas = Counter()
+    if before is not None:
+        deltas[rollup_key(before)] -= 1
+    if after is not None:
+        deltas[rollup_key(after)] += 1
+    return deltas
+
+def _rollup_source(model, team_id):
+    query = select(*[getattr(model, column) for column in ROLLUP_FIELDS])
+    return query if team_id is None else query.where(model.team_id == team_id)
+
+def rebuild_daily_stats(db):
+    """根据工作记录表和归档表全量重建汇总表，用于首次回填或修复；已绑定团队时只重建该团队的汇总
+
+    INSERT ... SELECT中的子查询不会附加团队条件，已绑定团队时需在两张表的查询上自行加条件
+    """
+    team_id = tenancy.current_team()
+    source = union_all(*[_rollup_source(model, team_id) for model in (WorkRecord, WorkRecordArchive)]).subquery()
+    grouped = select(
+        source.c.team_id,
+        source.c.start_date,
+        source.c.work_type,
+        source.c.recorder,
+        func.coalesce(source.c.priority, 2),
+        func.coalesce(source.c.is_completed, 0),
+        func.count(),
+    ).group_by(
+        source.c.team_id,
+        source.c.start_date,
+        source.c.work_type,
+        source.c.recorder,
+        func.coalesce(source.c.priority, 2),
+        func.coalesce(source.c.is_completed, 0),
+    )
+    try:
+        db.execute(delete(WorkRecordDailyStat))
+        db.execute(insert(WorkRecordDailyStat).from_select(
+            list(ROLLUP_FIELDS.values()) + ["record_count"], grouped
+        ))
+        data_versions.bump_version(db, data_versions.WORK_RECORDS)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    return db.query(WorkRecordDailyStat).count()
+
+def ensure_daily_stats(db):
+    """汇总表为空而已有工作记录时自动回填"""
+    if db.query(WorkRecordDailyStat.id).first() is None and db.query(WorkRecord.id).first() is not None:
+        rebuild_daily_stats(db)
+
+def _date_filters(start_date=None, end_date=None):
+    filters = [WorkRecordDailyStat.record_count > 0]
+    if start_date:
+        filters.append(WorkRecordDailyStat.day >= start_date)
+    if end_date:
+        filters.append(WorkRecordDailyStat.day <= end_date)
+    return filters
+
+def totals_query(field, start_date=None, end_date=None):
+    """按某个维度汇总记录数的查询"""
+    column = getattr(WorkRecordDailyStat, field)
+    return select(column, func.sum(WorkRecordDailyStat.record_count)).where(
+        *_date_filters(start_date, end_date)
+    ).group_by(column)
+
+def get_totals_by(db, field, start_date=None, end_date=None):
+    return {key: int(count) for key, count in db.execute(totals_query(field, start_date, end_date))}
+
+def resample_trend(daily_totals, granularity="week"):
+    """把每日计数重采样为日/周/月趋势，缺失的区间补0"""
+    if not daily_totals:
+        return pd.Series(dtype="int64")
+    series = pd.Series(daily_totals, dtype="int64")
+    series.index = pd.to_datetime(series.index)
+    return series.sort_index().resample(GRANULARITY_RULES[granularity]).sum()
+
+def get_trend(db, granularity="week", start_date=None, end_date=None):
+    return resample_trend(get_totals_by(db, "day", start_date, end_date), granularity)
+
+def main():
+    parser = argparse.ArgumentParser(description="工作记录每日汇总表维护")
+    parser.add_argument("command", choices=["rebuild"], help="rebuild: 根据全部记录重建汇总表")
+    parser.parse_args()
+
+    import db_utils
+    db_utils.init_db()
+    db = next(db_utils.get_db_session())
+    print(f"汇总表已重建，共 {rebuild_daily_stats(db)} 行")
+
+if __name__ == "__main__":
+    main()
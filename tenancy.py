@@ -0,0 +1,57 @@
+import contextvars
+import os
+from contextlib import contextmanager
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session, with_loader_criteria
+
+# 默认团队ID：升级前的存量数据、自助注册的用户以及未绑定团队时新建的数据都归入该团队
+DEFAULT_TEAM_ID = int(os.environ.get("DEFAULT_TEAM_ID", "1"))
+DEFAULT_TEAM_NAME = os.environ.get("DEFAULT_TEAM_NAME", "默认团队")
+
+# 当前脚本运行所属的团队，为None时不限定团队（命令行工具、后台任务）
+_current_team = contextvars.ContextVar("current_team", default=None)
+# 按团队隔离的模型，查询时自动附加team_id条件
+_scoped_models = []
+
+def scoped(model):
+    """类装饰器：登记按团队隔离的模型，模型需有team_id列"""
+    _scoped_models.append(model)
+    return model
+
+def bind_team(team_id):
+    """绑定当前脚本运行所属的团队，之后的ORM查询、批量更新和删除只作用于该团队的数据"""
+    _current_team.set(team_id)
+
+def current_team():
+    return _current_team.get()
+
+def team_for_insert():
+    """新建数据的team_id：已绑定团队时取该团队，否则归入默认团队"""
+    team_id = _current_team.get()
+    return DEFAULT_TEAM_ID if team_id is None else team_id
+
+@contextmanager
+def team_scope(team_id):
+    """临时切换团队，供按团队循环处理的后台任务使用；team_id为None表示不限定团队"""
+    token = _current_team.set(team_id)
+    try:
+        yield
+    finally:
+        _current_team.reset(token)
+
+@event.listens_for(Session, "do_orm_execute")
+def _scope_to_team(orm_execute_state):
+    """给ORM语句附加当前团队的条件
+
+    只对通过模型属性构造的语句生效（select(WorkRecord.id)、update(WorkRecord)等），
+    直接使用Table.c的Core语句、text()以及按主键的批量UPDATE（update(Model)配合参数列表）不受影响，需要时自行加条件
+    """
+    team_id = _current_team.get()
+    if team_id is None or not (orm_execute_state.is_select or orm_execute_state.is_update
+                               or orm_execute_state.is_delete):
+        return
+    orm_execute_state.statement = orm_execute_state.statement.options(*[
+        with_loader_criteria(model, lambda cls: cls.team_id == team_id, include_aliases=True)
+        for model in _scoped_models
+    ])
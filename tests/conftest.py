@@ -0,0 +1,29 @@
+import os
+import sys
+import tempfile
+
+# 数据库和文件目录在导入db_utils之前指向临时目录，测试不依赖MySQL
+_tmp = tempfile.mkdtemp(prefix="work_record_test_")
+os.environ.setdefault("DB_BACKEND", "sqlite")
+os.environ.setdefault("SQLITE_PATH", os.path.join(_tmp, "test.db"))
+os.environ.setdefault("API_PORT", "0")
+os.environ.setdefault("REPORT_DIR", os.path.join(_tmp, "reports"))
+os.environ.setdefault("BACKUP_DIR", os.path.join(_tmp, "backups"))
+os.environ.setdefault("DATA_VERSION_POLL_SECONDS", "0")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pytest
+
+import db_utils
+
+@pytest.fixture(scope="session", autouse=True)
+def init_db():
+    db_utils.init_db()
+
+@pytest.fixture
+def db():
+    session = next(db_utils.get_db_session())
+    try:
+        yield session
+    finally:
+        session.close()
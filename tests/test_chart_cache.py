@@ -0,0 +1,16 @@
+import chart_cache
+
+def test_none_result_is_cached():
+    """builder返回None时同样命中缓存，不会每次重跑都重新查询"""
+    calls = []
+
+    def builder():
+        calls.append(1)
+        return None
+
+    assert chart_cache.cached("test_none", 1, (), builder) is None
+    assert chart_cache.cached("test_none", 1, (), builder) is None
+    assert len(calls) == 1
+    # 数据版本变化后重新调用builder
+    chart_cache.cached("test_none", 2, (), builder)
+    assert len(calls) == 2
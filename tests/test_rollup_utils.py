@@ -0,0 +1,27 @@
+from datetime import date
+
+import db_utils
+import rollup_utils
+import tenancy
+from models import WorkRecordDailyStat
+
+def _totals(db):
+    return {(row.team_id, row.recorder): row.record_count for row in db.query(WorkRecordDailyStat)}
+
+def test_rebuild_with_team_bound_only_rebuilds_that_team(db):
+    """绑定团队时重建只删除并重新插入该团队的汇总，其他团队的汇总保持不变"""
+    other = db_utils.create_team(db, "汇总测试团队").id
+    with tenancy.team_scope(tenancy.DEFAULT_TEAM_ID):
+        db_utils.create_record(db, "汇总甲", "巡检", "内容", date(2024, 1, 1), date(2024, 1, 2), 1)
+    with tenancy.team_scope(other):
+        db_utils.create_record(db, "汇总乙", "巡检", "内容", date(2024, 1, 1), date(2024, 1, 2), 1)
+    with tenancy.team_scope(None):
+        rollup_utils.rebuild_daily_stats(db)
+        expected = _totals(db)
+
+    with tenancy.team_scope(other):
+        rollup_utils.rebuild_daily_stats(db)
+    with tenancy.team_scope(None):
+        assert _totals(db) == expected
+    assert expected[(other, "汇总乙")] == 1
+    assert expected[(tenancy.DEFAULT_TEAM_ID, "汇总甲")] == 1
@@ -0,0 +1,40 @@
+from datetime import date, timedelta
+
+from streamlit.testing.v1 import AppTest
+
+import auth_utils
+import db_utils
+import tenancy
+import work_record_views
+
+APP_PATH = work_record_views.__file__.replace("work_record_views.py", "app.py")
+
+def _todo_ids(at):
+    return [button.key.removeprefix("complete_") for button in at.button if (button.key or "").startswith("complete_")]
+
+def test_complete_after_loading_two_pages_renders_each_todo_once(db):
+    """加载两页后标记完成第一页的记录，第二页顺延，记录不重复也不遗漏"""
+    # 使用单独的团队，不受其他测试写入的记录影响
+    team_id = db_utils.create_team(db, "待办测试团队").id
+    db_utils.create_user(db, "todo_tester", "secret", team_id=team_id)
+    today = date.today()
+    with tenancy.team_scope(team_id):
+        for i in range(work_record_views.TODO_PAGE_SIZE + 5):
+            db_utils.create_record(db, "张三", "巡检", f"待办{i}", today - timedelta(days=10),
+                                   today - timedelta(days=i % 7), 2)
+
+    at = AppTest.from_file(APP_PATH, default_timeout=60)
+    at.session_state["jwt_token"] = auth_utils.generate_jwt_token("todo_tester")
+    at.session_state["current_work_record_view"] = "todo"
+    at.run()
+    assert len(_todo_ids(at)) == work_record_views.TODO_PAGE_SIZE
+
+    at.button(key="todo_load_more").click().run()
+    before = _todo_ids(at)
+    assert len(before) == len(set(before)) == work_record_views.TODO_PAGE_SIZE + 5
+
+    at.button(key=f"complete_{before[0]}").click().run()
+    assert not at.exception
+    after = _todo_ids(at)
+    assert len(after) == len(set(after))
+    assert set(after) == set(before) - {before[0]}
@@ -1,13 +1,19 @@
+import functools
+import os
 from datetime import date, timedelta
-from io import BytesIO
 
 import pandas as pd
-import plotly.express as px
 import streamlit as st
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils import get_column_letter
 
+import async_db_utils
+import chart_cache
 import db_utils
+import live_refresh
+import projections
+import report_utils
+import rollup_utils
+import tenancy
+import workload_utils
 
 # 在全局样式部分添加备份按钮样式
 st.markdown("""
@@ -26,12 +32,102 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
+# 表格编辑相关常量
+PRIORITY_LABELS = projections.PRIORITY_LABELS
+PRIORITY_VALUES = {label: value for value, label in PRIORITY_LABELS.items()}
+TODO_PAGE_SIZE = 20
+TIMELINE_WINDOWS = {"7天": 7, "14天": 14, "30天": 30, "90天": 90}
+TIMELINE_MAX_ROWS = 300
+TREND_GRANULARITIES = {
+    "day": ("日期", "每日工作记录数量"),
+    "week": ("周结束日期", "每周工作记录数量"),
+    "month": ("月份", "每月工作记录数量"),
+}
+RECORD_EDITOR_COLUMNS = ["ID", "记录人", "工作类型", "工作内容", "开始日期", "结束日期", "是否完成", "优先级"]
+RECORD_EDITOR_FIELDS = {
+    "记录人": "recorder",
+    "工作类型": "work_type",
+    "工作内容": "work_content",
+    "开始日期": "start_date",
+    "结束日期": "end_date",
+    "是否完成": "is_completed",
+    "优先级": "priority",
+}
+
+def _to_record_value(column, value):
+    """把表格单元格的值转换为数据库字段值"""
+    if column == "是否完成":
+        return 1 if bool(value) else 0
+    if column == "优先级":
+        return PRIORITY_VALUES.get(value, 2)
+    if column in ("开始日期", "结束日期") and isinstance(value, pd.Timestamp):
+        return value.date()
+    return value
+
+def _normalize_record_frame(df):
+    """统一日期列为date类型，避免Timestamp与date比较时误判为变化"""
+    df = df.copy()
+    for column in ("开始日期", "结束日期"):
+        df[column] = pd.to_datetime(df[column]).dt.date
+        df[column] = df[column].where(df[column].notna(), None)
+    return df
+
+def diff_record_frames(original_df, edited_df):
+    """对比原始表格和编辑后的表格，只返回发生变化的单元格
+
+    返回 (updates, inserts, deletes)，可直接传给 db_utils.apply_record_changes
+    """
+    original_df = _normalize_record_frame(original_df)
+    edited_df = _normalize_record_frame(edited_df)
+    existing = edited_df[edited_df["ID"].notna()]
+    added = edited_df[edited_df["ID"].isna()]
+
+    deletes = [int(i) for i in set(original_df["ID"]) - set(existing["ID"].astype(int))]
+
+    updates = []
+    if not existing.empty:
+        before = original_df.astype({"ID": int}).set_index("ID")
+        after = existing.astype({"ID": int}).set_index("ID")[before.columns]
+        before = before.loc[after.index]
+        changed = (before != after) & ~(before.isna() & after.isna())
+        for record_id, row_changed in changed[changed.any(axis=1)].iterrows():
+            update_row = {"id": int(record_id)}
+            for column in row_changed[row_changed].index:
+                update_row[RECORD_EDITOR_FIELDS[column]] = _to_record_value(column, after.at[record_id, column])
+            updates.append(update_row)
+
+    inserts = []
+    for _, row in added.iterrows():
+        # 完全空白的新增行直接忽略
+        if row.drop("ID").isna().all():
+            continue
+        inserts.append({
+            field: _to_record_value(column, row[column])
+            for column, field in RECORD_EDITOR_FIELDS.items()
+        })
+
+    return updates, inserts, deletes
+
+def _is_valid_record_change(row, original_df):
+    """校验单行变更：必填项非空且结束日期不早于开始日期"""
+    merged = {}
+    if "id" in row:
+        original = original_df[original_df["ID"] == row["id"]].iloc[0]
+        merged = {field: _to_record_value(column, original[column])
+                  for column, field in RECORD_EDITOR_FIELDS.items()}
+    merged.update(row)
+    for field in ("recorder", "work_type", "work_content", "start_date", "end_date"):
+        value = merged.get(field)
+        if value is None or (isinstance(value, float) and pd.isna(value)) or value == "":
+            return False
+    return merged["start_date"] <= merged["end_date"]
+
 def show_work_record_page():
     """展示工作记录管理页面"""
     st.markdown("### 📝 工作记录管理")
     
     # 功能卡片导航
-    cols = st.columns(4)
+    cols = st.columns(5)
     with cols[0]:
         if st.button("➕ 添加记录", use_container_width=True, key="add_record_btn"):
             st.session_state.current_work_record_view = "add"
@@ -44,6 +140,9 @@ def show_work_record_page():
     with cols[3]:
         if st.button("📋 待办事项", use_container_width=True, key="todo_btn"):
             st.session_state.current_work_record_view = "todo"
+    with cols[4]:
+        if st.button("📆 时间线", use_container_width=True, key="timeline_btn"):
+            st.session_state.current_work_record_view = "timeline"
 
     # 根据选择显示对应功能
     if 'current_work_record_view' not in st.session_state:
@@ -57,15 +156,19 @@ def show_work_record_page():
         show_statistics()
     elif st.session_state.current_work_record_view == "todo":
         show_todo_list()
+    elif st.session_state.current_work_record_view == "timeline":
+        show_timeline()
 
 def show_add_record_form():
     """展示添加记录表单"""
     with st.form("add_record_form"):
         db = next(db_utils.get_db_session())
-        today_duty = db_utils.get_today_duty_rotation(db)
         
-        recorder = st.text_input("记录人姓名")
-        work_type = st.text_input("工作类型")
+        # 从已有取值中选择，也可以输入新值
+        recorder = st.selectbox("记录人姓名", options=_value_options(db, "recorder"), index=None,
+                                accept_new_options=True, placeholder="选择或输入记录人")
+        work_type = st.selectbox("工作类型", options=_value_options(db, "work_type"), index=None,
+                                 accept_new_options=True, placeholder="选择或输入工作类型")
         work_content = st.text_area("工作内容")
         start_date = st.date_input("开始日期", value=date.today())
         end_date = st.date_input("结束日期", value=date.today())
@@ -94,286 +197,479 @@ def show_edit_records():
         with col2:
             completion_filter = st.selectbox("完成状态", options=[("全部", None), ("未完成", 0), ("已完成", 1)],
                                              format_func=lambda x: x[0])
+        # 记录人、工作类型从已有取值中选择（可输入关键字搜索），按等值条件走索引
         with col3:
-            recorder_filter = st.text_input("记录人")
+            recorder_filter = _value_filter("记录人", db, "recorder")
         with col4:
-            work_type_filter = st.text_input("工作类型")
+            work_type_filter = _value_filter("工作类型", db, "work_type")
+        include_archive = st.checkbox("包含归档记录", key="search_include_archive")
 
-        # 应用过滤器
-        records = db_utils.search_records(
+        # 应用过滤器（查询结果直接读成列式DataFrame）
+        records = projections.search_record_frame(
             db,
             priority=priority_filter[1],
             is_completed=completion_filter[1],
             recorder=recorder_filter,
-            work_type=work_type_filter
+            work_type=work_type_filter,
+            exact=True
         )
     
     # 如果没有搜索结果，显示所有记录
-    if not records:
-        records = db_utils.get_records(db)
+    if records.empty:
+        records = projections.list_record_frame(db)
         if priority_filter[1] or completion_filter[1] or recorder_filter or work_type_filter:
             st.info("没有找到匹配的记录，显示所有记录")
 
-    if records:
+    if not records.empty:
         # 分页控件
         col1, col2 = st.columns([3, 1])
         with col2:
             page_size = 10
             total_pages = (len(records) + page_size - 1) // page_size
             page = st.number_input("页码", min_value=1, max_value=total_pages, value=1, key="record_page")
+        page_records = records.iloc[(page - 1) * page_size:page * page_size]
 
-        # 表格展示，添加优先级显示
-        df = pd.DataFrame([{
-            "记录人": r.recorder,
-            "工作类型": r.work_type,
-            "工作内容": r.work_content,
-            "开始日期": r.start_date,
-            "结束日期": r.end_date,
-            "是否完成": "是" if r.is_completed else "否",
-            "优先级": ["低", "中", "高"][r.priority - 1] if r.priority in [1, 2, 3] else "未知"  # 添加优先级显示
-        } for r in records])
-
-        st.dataframe(df, use_container_width=True, hide_index=True)
-
-        # 编辑和删除区域
+        # 可编辑表格，ID列只读，支持新增和删除行
         st.markdown("#### ✏️ 编辑记录")
-        record_options = {
-            f"ID: {r.id} | 工作类型: {r.work_type} | 工作内容: {r.work_content} |开始日期: {r.start_date}": r.id for r
-            in records}
-        selected_record_label = st.selectbox(
-            "选择要编辑的记录",
-            options=list(record_options.keys()),
-            key="edit_record_select"
-        )
-        record_id = record_options[selected_record_label] if selected_record_label else None
-
-        if record_id:
-            record = next((r for r in records if r.id == record_id), None)
-            if record:
-                with st.form("edit_form"):
-                    new_recorder = st.text_input("记录人", value=record.recorder)
-                    new_work_type = st.text_input("工作类型", value=record.work_type)
-                    new_work_content = st.text_area("工作内容", value=record.work_content)
-                    new_start = st.date_input("开始日期", value=record.start_date)
-                    new_end = st.date_input("结束日期", value=record.end_date)
-                    is_completed = st.checkbox("已完成", value=bool(record.is_completed))
-                    # 添加优先级编辑
-                    priority_options = [("低", 1), ("中", 2), ("高", 3)]
-                    current_priority_index = [p[1] for p in priority_options].index(
-                        record.priority) if record.priority in [1, 2, 3] else 1
-                    new_priority = st.selectbox("优先级", options=priority_options, format_func=lambda x: x[0],
-                                                index=current_priority_index)
-
-                    if st.form_submit_button("更新记录"):
-                        if new_start <= new_end:
-                            db = next(db_utils.get_db_session())
-                            db_utils.update_record(
-                                db,
-                                record_id,
-                                recorder=new_recorder,
-                                work_type=new_work_type,
-                                work_content=new_work_content,
-                                start_date=new_start,
-                                end_date=new_end,
-                                is_completed=1 if is_completed else 0,
-                                priority=new_priority[1]  # 更新优先级
-                            )
-                            st.success("记录更新成功!")
-                            st.rerun()
-                        else:
-                            st.error("结束日期不能早于开始日期")
-        else:
-            st.warning("请选择一条记录进行编辑")
-
-        # 删除记录
-        st.subheader("🗑️ 删除记录")
-        del_record_label = st.selectbox(
-            "选择要删除的记录",
-            options=list(record_options.keys()),
-            key="delete_record_select"
+        st.caption("直接在表格中修改、添加或删除行，点击“保存修改”后一次性提交")
+        original_df = projections.display_frame(page_records, priority_default="中", completed_labels=None)
+        original_df = original_df[RECORD_EDITOR_COLUMNS].reset_index(drop=True)
+
+        if 'record_editor_version' not in st.session_state:
+            st.session_state.record_editor_version = 0
+        edited_df = st.data_editor(
+            original_df,
+            column_config={
+                "ID": st.column_config.NumberColumn("ID", disabled=True),
+                "记录人": st.column_config.TextColumn("记录人", required=True, max_chars=50),
+                "工作类型": st.column_config.TextColumn("工作类型", required=True, max_chars=50),
+                "工作内容": st.column_config.TextColumn("工作内容", required=True, max_chars=255),
+                "开始日期": st.column_config.DateColumn("开始日期", required=True),
+                "结束日期": st.column_config.DateColumn("结束日期", required=True),
+                "是否完成": st.column_config.CheckboxColumn("是否完成", default=False),
+                "优先级": st.column_config.SelectboxColumn("优先级", options=["低", "中", "高"],
+                                                         default="中", required=True),
+            },
+            num_rows="dynamic",
+            use_container_width=True,
+            hide_index=True,
+            key=f"record_editor_{page}_{st.session_state.record_editor_version}"
         )
-        del_id = record_options[del_record_label] if del_record_label else None
 
-        if st.button("删除记录", key="delete_record_btn") and del_id:
-            db = next(db_utils.get_db_session())
-            if db_utils.delete_record(db, del_id):
-                st.success("记录已删除!")
-                st.rerun()
+        updates, inserts, deletes = diff_record_frames(original_df, edited_df)
+        if updates or inserts or deletes:
+            st.info(f"待保存：修改 {len(updates)} 条，新增 {len(inserts)} 条，删除 {len(deletes)} 条")
+
+        if st.button("💾 保存修改", key="save_record_changes_btn", disabled=not (updates or inserts or deletes)):
+            invalid = [row for row in updates + inserts if not _is_valid_record_change(row, original_df)]
+            if invalid:
+                st.error("请填写完整信息且结束日期不能早于开始日期")
             else:
-                st.error("删除失败，请检查记录状态")
+                db = next(db_utils.get_db_session())
+                try:
+                    changed = db_utils.apply_record_changes(db, updates=updates, inserts=inserts, deletes=deletes)
+                except Exception as e:
+                    st.error(f"保存失败: {str(e)}")
+                else:
+                    # 更换表格key以清空编辑状态，避免新增行被重复提交
+                    st.session_state.record_editor_version += 1
+                    st.success(f"已保存 {changed} 条记录!")
+                    st.rerun()
     else:
         st.info("暂无工作记录")
 
+    # 归档记录只读展示，不参与表格编辑
+    if include_archive:
+        archived = projections.search_archived_record_frame(
+            db,
+            priority=priority_filter[1],
+            is_completed=completion_filter[1],
+            recorder=recorder_filter,
+            work_type=work_type_filter,
+            exact=True
+        )
+        st.markdown("#### 🗄️ 归档记录（只读）")
+        if not archived.empty:
+            st.dataframe(projections.display_frame(archived.drop(columns="is_completed")),
+                         use_container_width=True, hide_index=True)
+        else:
+            st.info("没有匹配的归档记录")
+
+def _value_options(db, field):
+    return [value for value, _ in db_utils.get_distinct_values(db, field)]
+
+def _value_filter(label, db, field):
+    """候选值下拉框，显示每个取值的未归档记录数（与筛选结果的条数一致），未选择时不筛选"""
+    counts = dict(db_utils.get_distinct_values(db, field))
+    return st.selectbox(label, options=list(counts), index=None, placeholder="全部",
+                        format_func=lambda value: f"{value}（{counts[value]}）", key=f"filter_{field}")
+
 def show_statistics():
     """展示统计数据图表"""
-    db = next(db_utils.get_db_session())
-    records = db_utils.get_records(db)
+    # 统计范围和趋势粒度
+    col1, col2, col3 = st.columns([1, 1, 2])
+    with col1:
+        stats_start = st.date_input("统计起始日期", value=date.today() - timedelta(days=365), key="stats_start")
+    with col2:
+        stats_end = st.date_input("统计结束日期", value=date.today(), key="stats_end")
+    with col3:
+        granularity = st.radio("趋势粒度", options=list(TREND_GRANULARITIES), index=1, horizontal=True,
+                               format_func=lambda x: TREND_GRANULARITIES[x][0], key="stats_granularity")
+
+    # 统计数据和图表按数据版本缓存，数据未变化时再次访问无需查询和重建图表
+    version = db_utils.get_data_version()
+    params = (stats_start, stats_end)
+    # 四个汇总查询并发执行，数据来自每日汇总表
+    stats = chart_cache.cached(
+        "statistics", version, params,
+        lambda: async_db_utils.run(async_db_utils.load_statistics(stats_start, stats_end), prefer_primary=True)
+    )
     
-    if records:
+    if stats["by_work_type"]:
         # 工作类型分布
         st.markdown("#### 📊 工作类型分布")
-        work_types = [r.work_type for r in records]
-        type_counts = pd.Series(work_types).value_counts()
-        
-        fig1 = px.pie(
-            values=type_counts.values, 
-            names=type_counts.index,
-            color_discrete_sequence=px.colors.qualitative.Pastel
-        )
-        fig1.update_traces(textposition='inside', textinfo='percent+label')
+        fig1 = chart_cache.cached("work_type_pie", version, params, lambda: _build_work_type_pie(stats))
         st.plotly_chart(fig1, use_container_width=True)
         
         # 记录人工作统计
         st.markdown("#### 📈 记录人工作统计")
-        recorders = [r.recorder for r in records]
-        recorder_counts = pd.Series(recorders).value_counts()
-        
-        fig2 = px.bar(
-            x=recorder_counts.index, 
-            y=recorder_counts.values,
-            color_discrete_sequence=['#636efa']
-        )
-        fig2.update_layout(
-            xaxis_title="记录人",
-            yaxis_title="记录数量",
-            hovermode="x unified"
-        )
+        fig2 = chart_cache.cached("recorder_bar", version, params, lambda: _build_recorder_bar(stats))
         st.plotly_chart(fig2, use_container_width=True)
         
         # 时间分布趋势
         st.markdown("#### 📅 时间分布趋势")
-        df = pd.DataFrame([{
-            "date": r.start_date,
-            "count": 1
-        } for r in records])
-        
-        if not df.empty:
-            df['date'] = pd.to_datetime(df['date'])
-            weekly = df.set_index('date').resample('W-MON').count()
-            full_date_range = pd.date_range(
-                start=weekly.index.min() if not weekly.empty else df['date'].min(),
-                end=weekly.index.max() if not weekly.empty else df['date'].max(),
-                freq='W-MON'
-            )
-            weekly = weekly.reindex(full_date_range, fill_value=0).rename_axis('week_end')
-            
-            fig3 = px.line(
-                weekly.reset_index(),
-                x='week_end',
-                y='count',
-                title='每周工作记录数量',
-                markers=True,
-                color_discrete_sequence=['#00cc96']
-            )
-            
-            fig3.update_layout(
-                xaxis_title="周结束日期",
-                yaxis_title="记录数量",
-                hovermode="x unified",
-                xaxis_rangeslider_visible=True,
-                showlegend=False
-            )
-            fig3.update_xaxes(tickformat="%Y-%m-%d")
-            
+        fig3 = chart_cache.cached("trend_line", version, params + (granularity,),
+                                  lambda: _build_trend_line(stats, granularity))
+        if fig3 is not None:
             st.plotly_chart(fig3, use_container_width=True)
             
         # 新增：优先级分布统计
         st.markdown("#### ⚡ 任务优先级分布")
-        priority_map = {1: "低", 2: "中", 3: "高"}
-        priorities = [priority_map.get(r.priority, "未知") for r in records]
-        priority_counts = pd.Series(priorities).value_counts()
-        
-        fig4 = px.bar(
-            x=priority_counts.index,
-            y=priority_counts.values,
-            color=priority_counts.index,
-            color_discrete_map={"低": "#4CAF50", "中": "#FFC107", "高": "#F44336"},
-            title="任务优先级分布"
-        )
-        fig4.update_layout(
-            xaxis_title="优先级",
-            yaxis_title="任务数量",
-            showlegend=False
-        )
+        fig4 = chart_cache.cached("priority_bar", version, params, lambda: _build_priority_bar(stats))
         st.plotly_chart(fig4, use_container_width=True)
-
-def show_todo_list():
-    """展示待办事项"""
-    db = next(db_utils.get_db_session())
-    uncompleted_records = db_utils.get_uncompleted_records(db, date.today())
-    if uncompleted_records:
-        # 按优先级排序显示
-        sorted_records = sorted(uncompleted_records, key=lambda x: x.priority, reverse=True)
-        for record in sorted_records:
-            with st.container(border=True):
-                # 根据优先级设置不同的边框颜色
-                priority_colors = {1: "#4CAF50", 2: "#FFC107", 3: "#F44336"}  # 低-绿, 中-黄, 高-红
-                priority_labels = {1: "低", 2: "中", 3: "高"}
-                
-                cols = st.columns([4, 1])
-                cols[0].markdown(f"""
-                **记录人**: {record.recorder}\n
-                **工作类型**: {record.work_type}\n
-                **内容**: {record.work_content}\n 
-                **截止日期**: {record.end_date}\n
-                **优先级**: <span style="color:{priority_colors.get(record.priority, '#000')}; font-weight:bold">{priority_labels.get(record.priority, '未知')}</span>
-                """, unsafe_allow_html=True)
-                
-                if cols[1].button("标记完成", key=f"complete_{record.id}"):
-                    db_utils.update_record(db, record.id, is_completed=1)
-                    st.rerun()
     else:
+        st.info("所选时间段内没有记录")
+
+    show_workload_heatmap(stats_start, stats_end, version)
+
+def show_workload_heatmap(window_start, window_end, version):
+    """人员工作负荷：每人每天进行中的工作数量，跨多天的记录在每一天都计入"""
+    st.markdown("#### 👥 人员工作负荷")
+    include_completed = st.checkbox("包含已完成的工作", value=True, key="workload_include_completed")
+    params = (window_start, window_end, include_completed)
+
+    def load():
+        db = next(db_utils.get_read_session(prefer_primary=True))
+        try:
+            return workload_utils.load_workload(db, window_start, window_end, include_completed=include_completed)
+        finally:
+            db.close()
+
+    matrix = chart_cache.cached("workload_matrix", version, params, load)
+    if matrix.empty or not matrix.to_numpy().any():
+        st.info("所选时间段内没有进行中的工作")
+        return
+    fig = chart_cache.cached("workload_heatmap", version, params, lambda: _build_workload_heatmap(matrix))
+    st.plotly_chart(fig, use_container_width=True)
+    with st.expander("负荷峰值"):
+        st.dataframe(workload_utils.peak_summary(matrix), use_container_width=True, hide_index=True)
+
+# plotly和openpyxl导入较慢，只在首次生成图表或导出时导入
+
+def _build_work_type_pie(stats):
+    import plotly.express as px
+    type_counts = pd.Series(stats["by_work_type"]).sort_values(ascending=False)
+    
+    fig = px.pie(
+        values=type_counts.values, 
+        names=type_counts.index,
+        color_discrete_sequence=px.colors.qualitative.Pastel
+    )
+    fig.update_traces(textposition='inside', textinfo='percent+label')
+    return fig
+
+def _build_recorder_bar(stats):
+    import plotly.express as px
+    recorder_counts = pd.Series(stats["by_recorder"]).sort_values(ascending=False)
+    
+    fig = px.bar(
+        x=recorder_counts.index, 
+        y=recorder_counts.values,
+        color_discrete_sequence=['#636efa']
+    )
+    fig.update_layout(
+        xaxis_title="记录人",
+        yaxis_title="记录数量",
+        hovermode="x unified"
+    )
+    return fig
+
+def _build_trend_line(stats, granularity):
+    import plotly.express as px
+    trend = rollup_utils.resample_trend(stats["by_day"], granularity)
+    if trend.empty:
+        return None
+
+    # 长序列在服务端降采样并改用WebGL，限制发送到浏览器的点数
+    period_label, title = TREND_GRANULARITIES[granularity]
+    x, y = chart_cache.downsample_lttb(trend.index.values, trend.values)
+    trend_df = pd.DataFrame({'period': x, 'count': y})
+    
+    fig = px.line(
+        trend_df,
+        x='period',
+        y='count',
+        title=title if len(trend) == len(trend_df) else f"{title}（已降采样至{len(trend_df)}点）",
+        markers=len(trend_df) <= chart_cache.WEBGL_THRESHOLD,
+        render_mode=chart_cache.render_mode(len(trend_df)),
+        color_discrete_sequence=['#00cc96']
+    )
+    
+    fig.update_layout(
+        xaxis_title=period_label,
+        yaxis_title="记录数量",
+        hovermode="x unified",
+        xaxis_rangeslider_visible=True,
+        showlegend=False
+    )
+    fig.update_xaxes(tickformat="%Y-%m-%d")
+    return fig
+
+def _build_workload_heatmap(matrix):
+    import plotly.express as px
+
+    heatmap, weekly = workload_utils.heatmap_frame(matrix)
+    fig = px.imshow(
+        heatmap,
+        aspect="auto",
+        color_continuous_scale="Blues",
+        labels={"x": "周起始日期" if weekly else "日期", "y": "记录人",
+                "color": "日均进行中工作数" if weekly else "进行中工作数"},
+        title="每周日均负荷" if weekly else "每日负荷",
+    )
+    fig.update_xaxes(tickformat="%Y-%m-%d")
+    fig.update_layout(height=max(300, 24 * len(heatmap) + 150))
+    return fig
+
+def _build_priority_bar(stats):
+    import plotly.express as px
+    priority_map = {1: "低", 2: "中", 3: "高"}
+    priority_counts = pd.Series({
+        priority_map.get(priority, "未知"): count for priority, count in stats["by_priority"].items()
+    }).sort_values(ascending=False)
+    
+    fig = px.bar(
+        x=priority_counts.index,
+        y=priority_counts.values,
+        color=priority_counts.index,
+        color_discrete_map={"低": "#4CAF50", "中": "#FFC107", "高": "#F44336"},
+        title="任务优先级分布"
+    )
+    fig.update_layout(
+        xaxis_title="优先级",
+        yaxis_title="任务数量",
+        showlegend=False
+    )
+    return fig
+
+@live_refresh.live_fragment()
+def show_todo_list(version):
+    """展示待办事项，按优先级和截止日期在数据库中排序，分页加载
+
+    作为自动刷新片段定时重跑，每页按数据版本缓存，其他用户修改后才重新查询
+    """
+    # 只保存已加载的页数，点击“加载更多”时加一；每次都从第一页开始，用上一页返回的游标取下一页，
+    # 数据变化后各页首尾相接，不会重复或遗漏记录
+    if 'todo_page_count' not in st.session_state:
+        st.session_state.todo_page_count = 1
+
+    today = date.today()
+    next_cursor = None
+    shown = 0
+    for _ in range(st.session_state.todo_page_count):
+        cursor = next_cursor
+        records, next_cursor = chart_cache.cached("todo_page", version, (today, cursor),
+                                                  lambda: _load_todo_page(today, cursor))
+        for record in records:
+            _show_todo_item(record)
+        shown += len(records)
+        if next_cursor is None:
+            break
+
+    if not shown:
         st.success("当前没有待办工作")
+    elif next_cursor is not None:
+        # 回调在片段重跑之前执行，本次重跑即显示新的一页，不需要再调用st.rerun
+        st.button(f"⬇️ 加载更多（已显示 {shown} 项）", key="todo_load_more", use_container_width=True,
+                  on_click=_load_more_todos)
+
+def _load_more_todos():
+    st.session_state.todo_page_count += 1
+
+def _load_todo_page(today, cursor):
+    db = next(db_utils.get_read_session(prefer_primary=True))
+    try:
+        return db_utils.get_todo_page(db, today, TODO_PAGE_SIZE, cursor)
+    finally:
+        db.close()
+
+def _show_todo_item(record):
+    with st.container(border=True):
+        # 根据优先级设置不同的边框颜色
+        priority_colors = {1: "#4CAF50", 2: "#FFC107", 3: "#F44336"}  # 低-绿, 中-黄, 高-红
+        priority_labels = {1: "低", 2: "中", 3: "高"}
+        
+        cols = st.columns([4, 1])
+        cols[0].markdown(f"""
+        **记录人**: {record.recorder}\n
+        **工作类型**: {record.work_type}\n
+        **内容**: {record.work_content}\n 
+        **截止日期**: {record.end_date}\n
+        **优先级**: <span style="color:{priority_colors.get(record.priority, '#000')}; font-weight:bold">{priority_labels.get(record.priority, '未知')}</span>
+        """, unsafe_allow_html=True)
+        
+        if cols[1].button("标记完成", key=f"complete_{record.id}"):
+            db = next(db_utils.get_db_session())
+            db_utils.update_record(db, record.id, is_completed=1)
+            st.rerun()
+
+XLSX_MIME = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+def show_timeline():
+    """展示时间线：所选时间窗口内进行中的工作，只查询和绘制窗口内的部分"""
+    st.markdown("#### 📆 工作时间线")
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        window_start = st.date_input("起始日期", value=date.today() - timedelta(days=3), key="timeline_start")
+    with col2:
+        window_label = st.selectbox("显示范围", list(TIMELINE_WINDOWS), key="timeline_window")
+    with col3:
+        st.write("")
+        include_completed = st.checkbox("包含已完成", key="timeline_include_completed")
+    window_end = window_start + timedelta(days=TIMELINE_WINDOWS[window_label] - 1)
+
+    def build():
+        db = next(db_utils.get_read_session(prefer_primary=True))
+        try:
+            records = db_utils.get_overlapping_frame(
+                db, window_start, window_end,
+                is_completed=None if include_completed else 0,
+                limit=TIMELINE_MAX_ROWS + 1
+            )
+        finally:
+            db.close()
+        if records.empty:
+            return None, 0
+        return _build_timeline(records.head(TIMELINE_MAX_ROWS), window_start, window_end), len(records)
+
+    params = (window_start, window_end, include_completed)
+    fig, count = chart_cache.cached("timeline", db_utils.get_data_version(), params, build)
+    if fig is None:
+        st.info("所选时间段内没有进行中的工作")
+        return
+    if count > TIMELINE_MAX_ROWS:
+        st.warning(f"进行中的工作超过 {TIMELINE_MAX_ROWS} 项，仅显示开始最早的 {TIMELINE_MAX_ROWS} 项，请缩小时间范围")
+    else:
+        st.caption(f"{window_start} ~ {window_end} 期间共 {count} 项工作进行中")
+    st.plotly_chart(fig, use_container_width=True)
+
+def _build_timeline(records, window_start, window_end):
+    import plotly.express as px
+
+    df = projections.display_frame(records)
+    window_stop = pd.Timestamp(window_end + timedelta(days=1))
+    # 条形裁剪到可见窗口内，结束日期当天计入，因此右端加一天
+    df["条形开始"] = pd.to_datetime(df["开始日期"]).clip(lower=pd.Timestamp(window_start))
+    df["条形结束"] = (pd.to_datetime(df["结束日期"]) + pd.Timedelta(days=1)).clip(upper=window_stop)
+    df["任务"] = "#" + df["ID"].astype(str) + " " + df["记录人"].astype(str) + "：" + df["工作内容"].astype(str).str.slice(0, 20)
+
+    fig = px.timeline(
+        df,
+        x_start="条形开始",
+        x_end="条形结束",
+        y="任务",
+        color="优先级",
+        color_discrete_map={"低": "#4CAF50", "中": "#FFC107", "高": "#F44336"},
+        hover_data={"工作类型": True, "开始日期": True, "结束日期": True, "是否完成": True,
+                    "条形开始": False, "条形结束": False},
+    )
+    fig.update_yaxes(autorange="reversed", title=None)
+    fig.update_xaxes(range=[pd.Timestamp(window_start), window_stop], tickformat="%m-%d")
+    if window_start <= date.today() <= window_end:
+        fig.add_vline(x=pd.Timestamp(date.today()), line_dash="dash", line_color="#6366f1")
+    fig.update_layout(height=max(300, 26 * len(df) + 120), showlegend=True, legend_title_text="优先级")
+    return fig
 
 def show_export_section():
     """展示导出功能"""
     st.markdown("### 📦 导出工作记录")
+    _show_report_snapshots()
+
+    st.markdown("#### 自定义时间段")
     col1, col2 = st.columns(2)
     with col1:
         export_start = st.date_input("起始日期", value=date.today() - timedelta(days=30))
     with col2:
         export_end = st.date_input("结束日期", value=date.today())
+    export_include_archive = st.checkbox("包含归档记录", key="export_include_archive")
 
     if st.button("📥 导出为Excel", use_container_width=True):
-        db = next(db_utils.get_db_session())
-        df = db_utils.export_to_excel(db, export_start, export_end)
+        db = next(db_utils.get_read_session())
+        try:
+            content = report_utils.build_report(db, export_start, export_end, include_archive=export_include_archive)
+        finally:
+            db.close()
         
-        if not df.empty:
-            output = BytesIO()
-            with pd.ExcelWriter(output, engine='openpyxl') as writer:
-                df.to_excel(writer, index=False, sheet_name='工作记录')
-                worksheet = writer.sheets['工作记录']
-                
-                header_font = Font(bold=True, color='FFFFFF')
-                header_fill = PatternFill(start_color='4F81BD', end_color='4F81BD', fill_type='solid')
-                alignment = Alignment(horizontal='center', vertical='center', wrap_text=True)
-                
-                for cell in worksheet[1]:
-                    cell.font = header_font
-                    cell.fill = header_fill
-                    cell.alignment = alignment
-                
-                for column in worksheet.columns:
-                    max_length = 0
-                    column_letter = get_column_letter(column[0].column)
-                    for cell in column:
-                        try:
-                            if len(str(cell.value)) > max_length:
-                                max_length = len(str(cell.value))
-                        except:
-                            pass
-                    adjusted_width = (max_length + 2)
-                    worksheet.column_dimensions[column_letter].width = min(adjusted_width, 50)
-                
-                worksheet.freeze_panes = 'A2'
-
-            output.seek(0)
-            
+        if content is not None:
             st.download_button(
                 label="下载Excel文件",
-                data=output,
+                data=content,
                 file_name=f"work_records_{export_start}_{export_end}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+                mime=XLSX_MIME
             )
         else:
-            st.warning("所选时间段内没有记录")
\ No newline at end of file
+            st.warning("所选时间段内没有记录")
+
+def _read_snapshot(meta):
+    """按(路径, 修改时间)缓存快照文件内容，页面重跑时不重复读取；调度器重新生成后修改时间变化，自动读取新文件"""
+    return _read_snapshot_file(meta["path"], os.stat(meta["path"]).st_mtime_ns)
+
+@functools.lru_cache(maxsize=16)
+def _read_snapshot_file(path, mtime_ns):
+    with open(path, "rb") as file:
+        return file.read()
+
+def _show_report_snapshots():
+    """列出调度器预生成的标准报表，直接下载已生成的文件"""
+    snapshots = [meta for meta in report_utils.current_snapshots() if meta["path"]]
+    if not snapshots:
+        return
+    st.markdown("#### 预生成报表")
+    version = db_utils.get_data_version()
+    columns = st.columns(len(snapshots))
+    for column, meta in zip(columns, snapshots):
+        with column:
+            st.download_button(
+                label=f"📄 {meta['label']}（{meta['start_date']} ~ {meta['end_date']}）",
+                data=_read_snapshot(meta),
+                file_name=os.path.basename(meta["path"]),
+                mime=XLSX_MIME,
+                key=f"snapshot_{meta['file']}",
+                use_container_width=True
+            )
+            stale = "，之后数据有更新" if meta["data_version"] != version else ""
+            st.caption(f"生成于 {meta['generated_at'].replace('T', ' ')}{stale}")
+
+    current_files = {meta["file"] for meta in snapshots}
+    history = [meta for meta in report_utils.list_snapshots(team_id=tenancy.team_for_insert())
+               if meta["path"] and meta["file"] not in current_files]
+    if history:
+        with st.expander("历史快照"):
+            selected = st.selectbox(
+                "选择快照", history,
+                format_func=lambda meta: f"{meta['label']} {meta['start_date']} ~ {meta['end_date']}"
+                                         f"（生成于 {meta['generated_at'].replace('T', ' ')}）"
+            )
+            st.download_button("下载所选快照", data=_read_snapshot(selected),
+                               file_name=os.path.basename(selected["path"]), mime=XLSX_MIME,
+                               key="snapshot_history_download")
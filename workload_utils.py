@@ -0,0 +1,88 @@
+import os
+from datetime import timedelta
+
+import numpy as np
+import pandas as pd
+
+import db_utils
+import projections
+
+# 热力图超过该天数时按周汇总（取每周日均负荷），避免向浏览器发送过多单元格
+HEATMAP_MAX_DAYS = int(os.environ.get("HEATMAP_MAX_DAYS", "180"))
+
+def _to_day_numbers(values):
+    """日期列转换为自1970-01-01起的天数"""
+    if isinstance(values, pd.Series) and isinstance(values.dtype, pd.ArrowDtype):
+        values = values.astype("datetime64[s]")
+    return np.asarray(values, dtype="datetime64[D]").astype("int64")
+
+def workload_matrix(recorders, start_dates, end_dates, window_start, window_end):
+    """把记录区间展开为 记录人 × 日期 的进行中工作数量矩阵
+
+    每条记录在开始日期 +1、结束日期次日 -1（差分数组），按天累加即得每天进行中的数量；
+    全程只有数组运算，不逐条记录或逐天循环。返回以记录人为行、日期为列的DataFrame
+    """
+    days = (window_end - window_start).days + 1
+    dates = pd.date_range(window_start, periods=max(days, 0), freq="D")
+    codes, names = pd.factorize(pd.Series(recorders), sort=True)
+    if days <= 0 or len(names) == 0:
+        return pd.DataFrame(index=pd.Index(names, name="记录人"), columns=dates, dtype="int64")
+
+    origin = np.datetime64(window_start, "D").astype("int64")
+    starts = np.clip(_to_day_numbers(start_dates) - origin, 0, days)
+    # 结束日期当天仍计入，差分在次日减一
+    ends = np.clip(_to_day_numbers(end_dates) - origin + 1, 0, days)
+    valid = (starts < ends) & (codes >= 0)
+    codes, starts, ends = codes[valid], starts[valid], ends[valid]
+
+    width = days + 1
+    size = len(names) * width
+    diff = (np.bincount(codes * width + starts, minlength=size)
+            - np.bincount(codes * width + ends, minlength=size))
+    matrix = diff.reshape(len(names), width)[:, :days].cumsum(axis=1)
+    return pd.DataFrame(matrix, index=pd.Index(names, name="记录人"), columns=dates)
+
+def load_workload(db, window_start, window_end, include_completed=True, include_archive=False):
+    """查询与窗口有交集的记录，只读取记录人和起止日期三列，返回负荷矩阵"""
+    intervals = db_utils.get_overlapping_frame(
+        db, window_start, window_end,
+        include_archive=include_archive,
+        is_completed=None if include_completed else 0,
+        row_type=projections.IntervalRow
+    )
+    if intervals.empty:
+        return workload_matrix([], [], [], window_start, window_end)
+    return workload_matrix(intervals["recorder"], intervals["start_date"], intervals["end_date"],
+                           window_start, window_end)
+
+def heatmap_frame(matrix, max_days=HEATMAP_MAX_DAYS):
+    """天数过多时按周汇总为日均负荷，返回 (矩阵, 是否已按周汇总)"""
+    if matrix.shape[1] <= max_days:
+        return matrix, False
+    weekly = matrix.T.resample("W-MON", label="left", closed="left").mean().T
+    return weekly.round(1), True
+
+def peak_summary(matrix):
+    """每个记录人的峰值负荷和平均负荷"""
+    if matrix.empty:
+        return pd.DataFrame(columns=["记录人", "峰值", "日均", "峰值日期"])
+    return pd.DataFrame({
+        "记录人": matrix.index,
+        "峰值": matrix.max(axis=1).to_numpy(),
+        "日均": matrix.mean(axis=1).round(2).to_numpy(),
+        "峰值日期": matrix.idxmax(axis=1).dt.date.to_numpy(),
+    }).sort_values("峰值", ascending=False, ignore_index=True)
+
+def naive_workload(recorders, start_dates, end_dates, window_start, window_end):
+    """逐条记录、逐天累加的参照实现，仅用于基准测试和结果校验"""
+    days = (window_end - window_start).days + 1
+    counts = {}
+    for recorder, start, end in zip(recorders, start_dates, end_dates):
+        row = counts.setdefault(recorder, [0] * days)
+        first = max((start - window_start).days, 0)
+        last = min((end - window_start).days, days - 1)
+        for offset in range(first, last + 1):
+            row[offset] += 1
+    names = sorted(counts)
+    return pd.DataFrame([counts[name] for name in names], index=pd.Index(names, name="记录人"),
+                        columns=pd.date_range(window_start, window_start + timedelta(days=days - 1), freq="D"))